@@ -0,0 +1,138 @@
+"""
+요청 로그(SymptomSearchLog, UserLocationLog, UserLog) 비동기 일괄 저장
+
+요청 스레드는 모델 인스턴스를 큐에 넣기만 하고, 프로세스마다 하나인 백그라운드 스레드가
+batch_size 개 또는 interval 초마다 모델별로 bulk_create 한다.
+큐가 가득 차면 (DB 장애 등) 새 로그는 버리고 개수만 센다.
+프로세스 종료 시 스레드를 멈추고, 스레드가 꺼내 두고 아직 저장하지 못한 배치와 큐에 남은 로그를 저장.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedLogWriter:
+    def __init__(self, max_size=10000, batch_size=200, interval=2.0):
+        self.queue = queue.Queue(maxsize=max_size)
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._dropped_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._inflight = [] # 스레드가 큐에서 꺼냈지만 아직 저장하지 않은 로그
+
+    def write(self, instance):
+        if self._stop.is_set():
+            # shutdown 이후에는 저장할 스레드가 없으므로 새로 띄우지 않고 버림
+            self._drop("Log writer shut down")
+            return
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(instance)
+        except queue.Full:
+            self._drop("Log buffer full")
+
+    def _drop(self, reason):
+        # 여러 요청 스레드가 동시에 부르므로 잠금 안에서 셈
+        with self._dropped_lock:
+            self.dropped += 1
+            dropped = self.dropped
+        if dropped % 1000 == 1:
+            logger.warning(f"{reason}, dropped {dropped} logs so far")
+
+    def _ensure_thread(self):
+        # gunicorn 워커는 fork 되므로 프로세스마다 스레드를 새로 띄움
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._stop.is_set() or (self._pid == os.getpid() and self._thread.is_alive()):
+                return
+            if self._pid != os.getpid():
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._save(batch)
+            with self._lock:
+                self._inflight = []
+            close_old_connections()
+
+    def _collect(self):
+        # 꺼내는 즉시 _inflight 에도 보이도록 같은 리스트에 담음
+        with self._lock:
+            batch = self._inflight = []
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _save(self, batch):
+        by_model = {}
+        for instance in batch:
+            by_model.setdefault(type(instance), []).append(instance)
+        for model, instances in by_model.items():
+            try:
+                model.objects.bulk_create(instances, batch_size=self.batch_size)
+            except Exception as e:
+                logger.error(f"{model.__name__} bulk insert failed ({len(instances)} rows): {e}")
+
+    def flush(self):
+        """큐에 남은 로그를 호출한 스레드에서 바로 저장"""
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._save(batch)
+
+    def shutdown(self, timeout=None):
+        """
+        스레드를 멈추고 저장 중인 배치가 끝날 때까지 기다린 뒤 (최대 timeout 초),
+        스레드가 꺼내 두고 저장하지 못한 배치와 큐에 남은 로그를 호출한 스레드에서 저장
+        """
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(self.interval + 5 if timeout is None else timeout)
+        with self._lock:
+            batch, self._inflight = self._inflight, []
+        if batch:
+            # 스레드가 제시간에 끝나지 않은 경우 (insert 도중이었다면 일부가 중복 저장될 수 있음)
+            self._save(batch)
+        self.flush()
+
+
+log_writer = BufferedLogWriter(
+    max_size=getattr(settings, 'LOG_BUFFER_MAX_SIZE', 10000),
+    batch_size=getattr(settings, 'LOG_BUFFER_BATCH_SIZE', 200),
+    interval=getattr(settings, 'LOG_BUFFER_INTERVAL', 2.0),
+)
+atexit.register(log_writer.shutdown)
+
+
+def write_log(instance):
+    """instance: 저장 전 로그 모델 인스턴스 (예: UserLog(user=..., action_type=...))"""
+    log_writer.write(instance)
@@ -11,9 +11,37 @@ class TokenApplicationSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'purpose', 'details', 'is_commercial', 'created_at']
         read_only_fields = ['id', 'user', 'created_at']
 
+def split_param(value):
+    return [v.strip() for v in (value or '').split(',') if v.strip()]
+
 class UserSerializer(serializers.ModelSerializer):
+    """
+    기본은 가벼운 사용자 정보만 (로그인/토큰 응답용)
+    - fields: 응답에 담을 필드만 (예: ?fields=id,name,email)
+    - expand: 무거운 필드를 포함 (예: ?expand=bookmarks)
+    인자로 주지 않으면 context 의 request 쿼리 파라미터를 사용
+    """
     bookmarked_hospitals = serializers.SerializerMethodField()
 
+    # expand 이름 -> 필드명
+    EXPANDABLE = {'bookmarks': 'bookmarked_hospitals'}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None:
+            if fields is None:
+                fields = split_param(request.query_params.get('fields'))
+            if expand is None:
+                expand = split_param(request.query_params.get('expand'))
+
+        expanded = {self.EXPANDABLE[name] for name in expand or () if name in self.EXPANDABLE}
+        for name in set(self.EXPANDABLE.values()) - expanded:
+            self.fields.pop(name)
+        if fields:
+            for name in set(self.fields) - set(fields) - expanded:
+                self.fields.pop(name)
+
     class Meta:
         model = User
         fields = [
@@ -46,16 +74,20 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_bookmarked_hospitals(self, obj):
         from hospitals.serializers import HospitalListSerializer
-        from hospitals.models import Hospital
-        from django.db.models import Avg, Count
-        
-        # 북마크된 병원 객체들을 가져오며 필요한 정보(평점, 리뷰수 등)를 계산(annotate)
-        hospitals = Hospital.objects.filter(bookmarked_by__user=obj).annotate(
-            average_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        ).prefetch_related('realtime_status', 'bookmarked_by')
-        
-        return HospitalListSerializer(hospitals, many=True, context=self.context).data
+        from hospitals import bookmarks, list_cache
+
+        # 캐시된 찜 hpid 집합으로 미리 만들어 둔 병원 목록 본문에서 골라냄 (병원 조회/직렬화 없음)
+        hpids = bookmarks.bookmarked_hpids(obj.id)
+        if not hpids:
+            return []
+        gen, _, body = list_cache.get_rendered(HospitalListSerializer, self.context)
+        payload = list_cache.get_payload(gen, body)
+        return [
+            dict(item, is_bookmarked=True)
+            for items in payload['data'].values()
+            for item in items
+            if item.get('hpid') in hpids
+        ]
 
 class SignupSerializer(serializers.ModelSerializer):
     password = serializers.CharField(
@@ -52,3 +52,72 @@ class KakaoLoginTest(TestCase):
         self.assertEqual(user.username, "123456789")  # username = kakao_id
         self.assertEqual(user.kakao_id, "123456789")
         self.assertEqual(user.sign_kind, User.SignKind.KAKAO)
+
+
+class UserSerializerFieldsTest(TestCase):
+    def test_slim_by_default_and_expand_bookmarks(self):
+        from .serializers import UserSerializer
+
+        user = User(username="slim", name="Slim User")
+        self.assertNotIn('bookmarked_hospitals', UserSerializer(user).data)
+        self.assertEqual(set(UserSerializer(user, fields=['id', 'name']).data), {'id', 'name'})
+
+        with patch('hospitals.bookmarks.bookmarked_hpids', return_value=frozenset()):
+            data = UserSerializer(user, fields=['id'], expand=['bookmarks']).data
+        self.assertEqual(data['bookmarked_hospitals'], [])
+
+
+class BufferedLogWriterTest(TestCase):
+    def test_flush_bulk_creates_per_model_and_drops_when_full(self):
+        from .log_writer import BufferedLogWriter
+        from .models import UserLog
+
+        writer = BufferedLogWriter(max_size=2, batch_size=10)
+        writer._ensure_thread = MagicMock()  # 백그라운드 스레드 없이 큐만 확인
+        for action in ('A', 'B', 'C'):
+            writer.write(UserLog(action_type=action))
+
+        with patch.object(UserLog.objects, 'bulk_create') as mock_bulk_create:
+            writer.flush()
+
+        self.assertEqual(writer.dropped, 1)
+        saved = mock_bulk_create.call_args.args[0]
+        self.assertEqual([log.action_type for log in saved], ['A', 'B'])
+
+    def test_shutdown_saves_inflight_batch_and_queue(self):
+        import threading
+        import time
+        from .log_writer import BufferedLogWriter
+        from .models import UserLog
+
+        saved, saving = [], threading.Event()
+
+        def slow_bulk_create(instances, batch_size=None):
+            saving.set()
+            time.sleep(0.2)
+            saved.extend(log.action_type for log in instances)
+
+        writer = BufferedLogWriter(batch_size=2, interval=0.05)
+        with patch.object(UserLog.objects, 'bulk_create', side_effect=slow_bulk_create):
+            for action in ('A', 'B', 'C'):
+                writer.write(UserLog(action_type=action))
+            # 스레드가 배치를 꺼내 저장하는 도중에 종료
+            self.assertTrue(saving.wait(1))
+            writer.shutdown(timeout=2)
+
+        self.assertFalse(writer._thread.is_alive())
+        self.assertEqual(sorted(saved), ['A', 'B', 'C'])
+
+    def test_write_after_shutdown_drops_without_new_thread(self):
+        from .log_writer import BufferedLogWriter
+        from .models import UserLog
+
+        writer = BufferedLogWriter()
+        writer.shutdown(timeout=1)
+        with patch('accounts.log_writer.threading.Thread') as mock_thread:
+            writer.write(UserLog(action_type='A'))
+            writer.write(UserLog(action_type='B'))
+
+        mock_thread.assert_not_called()
+        self.assertEqual(writer.dropped, 2)
+        self.assertTrue(writer.queue.empty())
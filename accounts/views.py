@@ -14,6 +14,7 @@ from .serializers import (
     TokenApplicationSerializer
 )
 from .models import ParamedicAuthHistory, EmailVerification, UserLog, TokenApplication
+from .log_writer import write_log
 import requests
 import random
 import uuid
@@ -412,7 +413,7 @@ class ProfileUpdateView(APIView):
         serializer = ProfileUpdateSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            UserLog.objects.create(user=user, action_type='PROFILE_UPDATE', details=str(serializer.validated_data))
+            write_log(UserLog(user=user, action_type='PROFILE_UPDATE', details=str(serializer.validated_data)))
             return Response({"result": True, "user": UserSerializer(user).data}, status=status.HTTP_200_OK)
         return Response({"result": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -427,11 +428,11 @@ class ProfileDeleteView(APIView):
         user.save()
         
         # 탈퇴 로그 기록
-        UserLog.objects.create(
+        write_log(UserLog(
             user=user, 
             action_type='WITHDRAWAL', 
             details=f"User withdrew at {user.withdrawn_at}"
-        )
+        ))
         
         return Response({"result": True, "message": "회원 탈퇴가 완료되었습니다."}, status=status.HTTP_200_OK)
 
@@ -450,7 +451,7 @@ class ChangePasswordView(APIView):
             
             user.set_password(serializer.validated_data['new_password'])
             user.save()
-            UserLog.objects.create(user=user, action_type='PASSWORD_CHANGE', details="User initiated password change")
+            write_log(UserLog(user=user, action_type='PASSWORD_CHANGE', details="User initiated password change"))
             return Response({"result": True, "message": "비밀번호가 변경되었습니다."}, status=status.HTTP_200_OK)
         return Response({"result": False, "errors": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -637,7 +638,7 @@ class ResetPasswordView(APIView):
                 user.can_password_edit = False
                 user.save()
                 
-                UserLog.objects.create(user=user, action_type='PASSWORD_RESET', details="Password reset via email auth")
+                write_log(UserLog(user=user, action_type='PASSWORD_RESET', details="Password reset via email auth"))
                 
                 return Response({"result": True, "message": "비밀번호가 재설정되었습니다."}, status=status.HTTP_200_OK)
             else:
@@ -915,7 +916,9 @@ class MyPageView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        serializer = UserSerializer(request.user, context={'request': request})
+        # 마이페이지는 기존처럼 찜 목록 포함 (?expand= 로 바꿀 수 있음)
+        expand = None if 'expand' in request.query_params else ['bookmarks']
+        serializer = UserSerializer(request.user, context={'request': request}, expand=expand)
         return Response({
             "result": True,
             "user": serializer.data
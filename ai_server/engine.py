@@ -0,0 +1,343 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import EngineMetrics
+from tuning import AdaptiveController
+
+logger = logging.getLogger(__name__)
+
+# 모델 프로세스와 HTTP 워커가 공유하는 Unix 소켓 경로
+SOCKET_PATH = os.getenv("MODEL_SOCKET", "/tmp/ai_model.sock")
+
+EXTRACT_SYSTEM_PROMPT = "당신은 응급 의료 AI입니다. 문장에서 필수 정보 {age, gender, symptoms}를 우선적으로 추출하고, 선택 정보 {is_self, history, special_note}는 확인되는 경우에만 추출하세요."
+# 모든 추출 요청이 공유하는 프롬프트 앞부분 (워밍업 때 KV 캐시에 미리 올려둠)
+EXTRACT_PREFIX = f"<|im_start|>system\n{EXTRACT_SYSTEM_PROMPT}<|im_end|>\n<|im_start|>user\n"
+
+# 워밍업용 합성 입력
+WARMUP_TEXTS = [
+    "30대 남성인데 어제부터 머리가 깨질 듯이 아프고 토할 것 같아요",
+    "5살 여자아이가 열이 39도까지 오르고 숨을 헐떡여요",
+    "할머니가 계단에서 넘어지셨는데 손목이 붓고 움직이지를 못하세요",
+]
+
+
+def build_extract_prompt(text):
+    return f"{EXTRACT_PREFIX}{text}<|im_end|>\n<|im_start|>assistant\n"
+
+
+def prefault_file(path, chunk_size=8 * 2 ** 20):
+    """GGUF 파일을 끝까지 읽어 페이지 캐시에 올림 -> 이후 mmap 접근은 디스크 I/O 없이 처리"""
+    total = 0
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            total += len(chunk)
+    return total
+
+
+class Overloaded(Exception):
+    """대기열이 가득 찼거나 클라이언트 타임아웃 안에 처리할 수 없는 요청"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Server busy (retry after {retry_after:.1f}s)")
+        self.retry_after = retry_after
+
+
+def load_model(model_path, config):
+    from llama_cpp import Llama
+
+    # use_mmap(기본값): GGUF 가중치는 페이지 캐시를 통해 공유되므로 슬롯을 늘려도 복사본이 생기지 않음
+    return Llama(
+        model_path=model_path,
+        n_ctx=config.n_ctx,
+        n_threads=config.n_threads,
+        n_batch=config.n_batch,
+        n_gpu_layers=config.n_gpu_layers,
+        use_mlock=config.mlock,
+        verbose=False
+    )
+
+
+def set_threads(llm, n_threads):
+    if llm.n_threads == n_threads:
+        return
+    import llama_cpp
+    llama_cpp.llama_set_n_threads(llm.ctx, n_threads, n_threads)
+    llm.n_threads = n_threads
+    llm.n_threads_batch = n_threads
+
+
+class LocalEngine:
+    """같은 프로세스에 로드된 Llama 슬롯들로 추론"""
+
+    def __init__(self, slots, config, controller=None, max_queue=None):
+        self.slots = list(slots)
+        self.free = list(self.slots)
+        self.config = config
+        self.controller = controller
+        # Llama 객체는 thread-safe 하지 않으므로 슬롯 하나는 한 번에 한 스레드에서만 사용
+        self.executor = ThreadPoolExecutor(max_workers=len(self.slots), thread_name_prefix="llama")
+        self.cond = asyncio.Condition()
+        self.waiting = 0
+        # 대기열 상한 (넘치면 즉시 503)
+        self.max_queue = max_queue or int(os.getenv("MAX_QUEUE", 4 * len(self.slots)))
+        # 요청 1건 처리 시간 추정치 (지수 이동 평균, 초)
+        self.service_time = 1.0
+        self.metrics = EngineMetrics(self)
+        # 워밍업이 끝나기 전까지 /health 는 준비되지 않음으로 응답
+        self.ready = False
+
+    @classmethod
+    def load(cls, model_path, config, adaptive=True):
+        slots = [load_model(model_path, config) for _ in range(config.max_slots)]
+        return cls(slots, config, AdaptiveController(config, enabled=adaptive))
+
+    @property
+    def limit(self):
+        return self.controller.active if self.controller else len(self.slots)
+
+    @property
+    def in_use(self):
+        return len(self.slots) - len(self.free)
+
+    def estimate_wait(self):
+        """지금 들어온 요청이 슬롯을 얻기까지 걸릴 예상 시간(초)"""
+        if not self.waiting and self.in_use < self.limit:
+            return 0.0
+        return math.ceil((self.waiting + 1) / self.limit) * self.service_time
+
+    def _admit(self, timeout):
+        if self.waiting >= self.max_queue:
+            self.metrics.requests.inc("overloaded")
+            raise Overloaded(self.estimate_wait())
+        if timeout is not None:
+            wait = self.estimate_wait()
+            # 클라이언트가 포기한 뒤에 끝날 요청은 받지 않음 (HYBRID_SPOT 이 바로 GPU로 넘어가도록)
+            if wait + self.service_time > timeout:
+                self.metrics.requests.inc("overloaded")
+                raise Overloaded(wait)
+
+    def _slot_available(self):
+        return self.free and self.in_use < self.limit
+
+    async def _acquire(self, timeout=None):
+        async with self.cond:
+            if not self.waiting and self._slot_available():
+                return self.free.pop()
+            self.waiting += 1
+            if self.controller:
+                self.controller.observe_queue(self.waiting)
+            try:
+                # 슬롯을 꺼내기 전에 타임아웃이 나므로 슬롯이 새지 않음
+                await asyncio.wait_for(self.cond.wait_for(self._slot_available), timeout)
+            except asyncio.TimeoutError:
+                self.metrics.requests.inc("timeout")
+                raise Overloaded(self.estimate_wait())
+            finally:
+                self.waiting -= 1
+            return self.free.pop()
+
+    async def _release(self, llm):
+        async with self.cond:
+            self.free.append(llm)
+            self.cond.notify_all()
+
+    def _run(self, llm, threads, prompt, max_tokens, stop, temperature, on_token):
+        from llama_cpp import StoppingCriteriaList
+
+        if threads:
+            set_threads(llm, threads)
+        return llm(
+            prompt, max_tokens=max_tokens, stop=stop, echo=False, temperature=temperature,
+            stopping_criteria=StoppingCriteriaList([on_token])
+        )
+
+    async def complete(self, prompt, max_tokens=256, stop=None, temperature=0.1, timeout=None, cancel=None):
+        """
+        timeout: 클라이언트가 기다릴 수 있는 시간(초). 대기 중에 넘기면 Overloaded
+        cancel: threading.Event. 설정되면(클라이언트 연결 끊김) 생성 중이라도 중단
+        """
+        self._admit(timeout)
+        arrived = time.monotonic()
+        deadline = arrived + timeout if timeout is not None else None
+        cancel = cancel or threading.Event()
+
+        llm = await self._acquire(timeout)
+        started = time.monotonic()
+        self.metrics.slot_occupancy.observe(self.in_use)
+
+        first_token = []
+
+        def on_token(tokens, logits):
+            # 토큰이 하나 샘플링될 때마다 호출됨. 첫 호출 시각 = 프롬프트 평가 완료 시각
+            if not first_token:
+                first_token.append(time.monotonic())
+            return cancel.is_set() or (deadline is not None and time.monotonic() > deadline)
+
+        threads = self.controller.threads if self.controller else None
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, self._run, llm, threads, prompt, max_tokens, stop or ["<|im_end|>"], temperature,
+            on_token
+        )
+        try:
+            output = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # 태스크가 취소되어도 스레드는 계속 돌기 때문에 생성 중단 신호를 보내고,
+            # 슬롯은 스레드가 실제로 끝난 뒤에 반납
+            cancel.set()
+            self.metrics.requests.inc("cancelled")
+            future.add_done_callback(lambda f: f.exception() if not f.cancelled() else None)
+            future.add_done_callback(lambda f: loop.create_task(self._release(llm)))
+            raise
+        except Exception:
+            self.metrics.requests.inc("error")
+            await self._release(llm)
+            raise
+        await self._release(llm)
+
+        finished = time.monotonic()
+        first = first_token[0] if first_token else finished
+        usage = output['usage']
+        decode = finished - first
+        generated = usage['completion_tokens']
+        # 첫 토큰은 프롬프트 평가 구간에 포함되므로 제외
+        rate = (generated - 1) / decode if decode > 0 and generated > 1 else 0
+        timings = {
+            "queue_wait": round(started - arrived, 4),
+            "prompt_eval": round(first - started, 4),
+            "decode": round(decode, 4),
+            "total": round(finished - arrived, 4),
+            "prompt_tokens": usage['prompt_tokens'],
+            "generated_tokens": generated,
+            "tokens_per_second": round(rate, 2),
+        }
+
+        self.service_time = 0.8 * self.service_time + 0.2 * (finished - started)
+        self.metrics.requests.inc("ok")
+        self.metrics.observe(timings)
+        if self.controller:
+            self.controller.record(generated)
+        return {"content": output['choices'][0]['text'].strip(), "timings": timings}
+
+    def _prime(self, llm):
+        # 공통 시스템 프롬프트를 평가해 둠 -> 다음 요청은 Llama 의 prefix 재사용으로 이 부분을 건너뜀
+        tokens = llm.tokenize(EXTRACT_PREFIX.encode("utf-8"), special=True)
+        llm.reset()
+        llm.eval(tokens)
+
+    async def warm_up(self, model_path, runs=None, prefault=None):
+        """
+        첫 실제 요청이 페이지 폴트/초기 할당 비용을 치르지 않도록 준비 (WARMUP_RUNS, WARMUP_PREFAULT)
+        1) GGUF 파일 pre-fault  2) 슬롯마다 합성 추출 실행  3) 시스템 프롬프트 KV 캐시 준비
+        """
+        runs = int(os.getenv("WARMUP_RUNS", "2")) if runs is None else runs
+        prefault = os.getenv("WARMUP_PREFAULT", "1") == "1" if prefault is None else prefault
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+
+        if prefault:
+            size = await loop.run_in_executor(None, prefault_file, model_path)
+            logger.info(f"Warm-up: pre-faulted {size / 2 ** 20:.0f} MiB in {time.monotonic() - started:.1f}s")
+
+        threads = self.controller.threads if self.controller else None
+        durations = []
+        for llm in self.slots:
+            for i in range(runs):
+                run_started = time.monotonic()
+                await loop.run_in_executor(
+                    self.executor, self._run, llm, threads, build_extract_prompt(WARMUP_TEXTS[i % len(WARMUP_TEXTS)]),
+                    64, ["<|im_end|>"], 0.1, lambda tokens, logits: False
+                )
+                durations.append(time.monotonic() - run_started)
+            await loop.run_in_executor(self.executor, self._prime, llm)
+
+        if durations:
+            # 첫 실행(할당 비용 포함)을 뺀 값으로 부하 차단용 처리 시간 추정치 초기화
+            steady = durations[1:] or durations
+            self.service_time = sum(steady) / len(steady)
+        self.ready = True
+        logger.info(f"Warm-up finished in {time.monotonic() - started:.1f}s (runs={len(durations)})")
+
+    async def ping(self):
+        return bool(self.slots)
+
+    async def render_metrics(self):
+        return self.metrics.render()
+
+    async def describe(self):
+        info = {
+            "ready": self.ready,
+            "config": self.config.to_dict(),
+            "slots_in_use": self.in_use,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "service_time": round(self.service_time, 3),
+        }
+        if self.controller:
+            info.update(self.controller.to_dict())
+        return info
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.slots = []
+        self.free = []
+
+
+class IpcEngine:
+    """model_server.py 프로세스에 Unix 소켓(JSON 한 줄)으로 요청을 전달"""
+
+    def __init__(self, socket_path=SOCKET_PATH):
+        self.socket_path = socket_path
+
+    async def _request(self, payload):
+        reader, writer = await asyncio.open_unix_connection(self.socket_path, limit=2 ** 20)
+        try:
+            writer.write(json.dumps(payload, ensure_ascii=False).encode() + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+        finally:
+            writer.close()
+        if not line:
+            raise ConnectionError("Model server closed connection")
+        response = json.loads(line)
+        if not response.pop("ok", False):
+            if response.get("error") == "overloaded":
+                raise Overloaded(response.get("retry_after", 1.0))
+            raise RuntimeError(response.get("error", "Model server error"))
+        return response
+
+    async def complete(self, prompt, max_tokens=256, stop=None, temperature=0.1, timeout=None, cancel=None):
+        # 태스크가 취소되면 소켓이 닫히고, 모델 서버는 이를 감지해 생성을 중단함
+        return await self._request({
+            "op": "completion",
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "stop": stop or ["<|im_end|>"],
+            "temperature": temperature,
+            "timeout": timeout,
+        })
+
+    async def ping(self):
+        try:
+            await self._request({"op": "ping"})
+            return True
+        except (OSError, ConnectionError, RuntimeError):
+            return False
+
+    async def describe(self):
+        return await self._request({"op": "config"})
+
+    async def render_metrics(self):
+        return (await self._request({"op": "metrics"}))["text"]
+
+    def close(self):
+        pass
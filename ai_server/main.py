@@ -1,48 +1,54 @@
 import asyncio
+import math
 import os
 import json
 import logging
 import re
+import threading
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
-from llama_cpp import Llama
+from engine import LocalEngine, IpcEngine, Overloaded, build_extract_prompt
+from tuning import ModelConfig
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-llm = None
-model_semaphore = None
+# AI_BACKEND=local: 워커마다 모델 로드 (기존 방식)
+# AI_BACKEND=ipc: model_server.py 프로세스 하나가 모델을 소유하고 워커는 요청만 전달
+AI_BACKEND = os.getenv("AI_BACKEND", "local").lower()
+
+engine = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global llm, model_semaphore
-    # 워커당 2명까지 동시 진입 허용 (나머지는 대기)
-    model_semaphore = asyncio.Semaphore(2)
-    
-    model_path = os.getenv("MODEL_PATH")
-    n_gpu_layers = int(os.getenv("N_GPU_LAYERS", "0"))
-    
-    if not model_path or not os.path.exists(model_path):
-        logger.error(f"Model not found: {model_path}")
+    global engine
+
+    if AI_BACKEND == "ipc":
+        engine = IpcEngine()
+        logger.info(f"Using model server at {engine.socket_path}")
     else:
-        logger.info(f"Loading Model... (Threads: 2)")
-        try:
-            llm = Llama(
-                model_path=model_path,
-                n_ctx=2048,
-                n_threads=2, # 스레드 2개로 제한 (워커 2개 x 스레드 2개 = 4 vCPU)
-                n_batch=512,
-                n_gpu_layers=n_gpu_layers,
-                verbose=False
-            )
-            logger.info("Model Loaded.")
-        except Exception as e:
-            logger.error(f"Load failed: {e}")
-    
+        model_path = os.getenv("MODEL_PATH")
+        # 워커마다 모델을 로드하므로 코어를 워커 수(uvicorn WEB_CONCURRENCY)로 나눔
+        config = ModelConfig.detect(workers=int(os.getenv("WEB_CONCURRENCY", "1")))
+
+        if not model_path or not os.path.exists(model_path):
+            logger.error(f"Model not found: {model_path}")
+        else:
+            logger.info(f"Loading Model... ({config})")
+            try:
+                engine = LocalEngine.load(model_path, config, adaptive=os.getenv("ADAPTIVE", "1") == "1")
+                logger.info("Model Loaded.")
+                await engine.warm_up(model_path)
+            except Exception as e:
+                logger.error(f"Load failed: {e}")
+
     yield
-    llm = None
+    if engine is not None:
+        engine.close()
+    engine = None
 
 app = FastAPI(lifespan=lifespan)
 
@@ -55,35 +61,88 @@ class CompletionRequest(BaseModel):
 class ExtractionRequest(BaseModel):
     text: str
 
+def request_timeout(request: Request):
+    """클라이언트가 기다릴 수 있는 시간(초). InferenceEngine 이 X-Request-Timeout 헤더로 전달"""
+    try:
+        return float(request.headers["X-Request-Timeout"])
+    except (KeyError, ValueError):
+        return None
+
+async def run_completion(request: Request, prompt, max_tokens, stop, temperature):
+    if engine is None: raise HTTPException(503, "Model not loaded")
+
+    # 동시 실행 수는 엔진의 슬롯 수(AdaptiveController)가 제한
+    cancel = threading.Event()
+    task = asyncio.ensure_future(engine.complete(
+        prompt, max_tokens=max_tokens, stop=stop, temperature=temperature,
+        timeout=request_timeout(request), cancel=cancel
+    ))
+    try:
+        # 대기/생성 중 클라이언트가 끊기면 아무도 읽지 않을 응답이므로 중단
+        while not (await asyncio.wait({task}, timeout=0.5))[0]:
+            if await request.is_disconnected():
+                cancel.set()
+                task.cancel()
+                logger.info("Client disconnected, request dropped")
+                raise HTTPException(503, "Client disconnected")
+        return task.result()
+    except Overloaded as e:
+        raise HTTPException(503, "Server busy", headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+    except (OSError, ConnectionError, RuntimeError) as e:
+        # 모델 프로세스가 아직 뜨지 않았거나 재시작 중 (IpcEngine 은 모델 서버 오류를 RuntimeError 로 전달)
+        logger.error(f"Model server unavailable: {e}")
+        raise HTTPException(503, "Model not loaded")
+
+def server_timing(response: Response, timings):
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={timings[name] * 1000:.1f}" for name in ("queue_wait", "prompt_eval", "decode")
+    )
+
+@app.get("/health")
+async def health():
+    """모델 로드 + 워밍업 완료 여부와 대기열 상태. 준비되지 않았으면 503 (scale_gpu.py 준비 확인용)"""
+    info = {"model_loaded": False, "ready": False, "queue_depth": None, "slots_in_use": None}
+    if engine is not None:
+        try:
+            state = await engine.describe()
+            info.update(model_loaded=True, ready=state["ready"],
+                        queue_depth=state["queue_depth"], slots_in_use=state["slots_in_use"])
+        except (OSError, ConnectionError, RuntimeError):
+            pass
+    return JSONResponse({"status": "ok" if info["ready"] else "loading", **info},
+                        status_code=200 if info["ready"] else 503)
+
+@app.get("/metrics")
+async def metrics():
+    if engine is None: raise HTTPException(503, "Model not loaded")
+    try:
+        text = await engine.render_metrics()
+    except (OSError, ConnectionError, RuntimeError) as e:
+        raise HTTPException(503, f"Model server unavailable: {e}")
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.get("/config")
+async def get_config():
+    if engine is None: raise HTTPException(503, "Model not loaded")
+    try:
+        return await engine.describe()
+    except (OSError, ConnectionError, RuntimeError) as e:
+        raise HTTPException(503, f"Model server unavailable: {e}")
+
 @app.post("/completion")
-async def completion(req: CompletionRequest):
-    if llm is None: raise HTTPException(503, "Model not loaded")
-    
-    # 세마포어 획득 (최대 2명)
-    async with model_semaphore:
-        loop = asyncio.get_event_loop()
-        output = await loop.run_in_executor(None, lambda: llm(
-            req.prompt, max_tokens=req.n_predict, stop=req.stop, echo=False, temperature=req.temperature
-        ))
-        return {"content": output['choices'][0]['text'].strip()}
+async def completion(req: CompletionRequest, request: Request, response: Response):
+    output = await run_completion(request, req.prompt, req.n_predict, req.stop, req.temperature)
+    server_timing(response, output['timings'])
+    return {"content": output['content'], "timings": output['timings']}
 
 @app.post("/extract")
-async def extract_info(req: ExtractionRequest):
-    system_prompt = "당신은 응급 의료 AI입니다. 문장에서 필수 정보 {age, gender, symptoms}를 우선적으로 추출하고, 선택 정보 {is_self, history, special_note}는 확인되는 경우에만 추출하세요."
-    prompt = f"<|im_start|>system\n{system_prompt}<|im_end|>\n<|im_start|>user\n{req.text}<|im_end|>\n<|im_start|>assistant\n"
-    
-    # 내부 함수 호출 (CompletionRequest 생성)
-    if llm is None: raise HTTPException(503, "Model not loaded")
-    
-    async with model_semaphore:
-        loop = asyncio.get_event_loop()
-        output = await loop.run_in_executor(None, lambda: llm(
-            prompt, max_tokens=256, stop=["<|im_end|>"], echo=False, temperature=0.1
-        ))
-        response_text = output['choices'][0]['text'].strip()
-        
-        try:
-            cleaned = re.sub(r'```json\s*|```', '', response_text).strip()
-            return json.loads(cleaned)
-        except:
-            return {}
+async def extract_info(req: ExtractionRequest, request: Request, response: Response):
+    output = await run_completion(request, build_extract_prompt(req.text), 256, ["<|im_end|>"], 0.1)
+    server_timing(response, output['timings'])
+    response_text = output['content']
+
+    try:
+        cleaned = re.sub(r'```json\s*|```', '', response_text).strip()
+        return json.loads(cleaned)
+    except:
+        return {}
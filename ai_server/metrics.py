@@ -0,0 +1,120 @@
+"""
+Prometheus 텍스트 포맷(0.0.4) 메트릭
+
+모델을 소유한 프로세스(LocalEngine)에만 쌓이므로 멀티프로세스 집계가 필요 없다.
+"""
+import math
+import threading
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30)
+TOKEN_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+RATE_BUCKETS = (5, 10, 20, 40, 80, 160, 320)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, label_name=None):
+        self.name = name
+        self.help = help_text
+        self.label_name = label_name
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, label=None, amount=1):
+        with self.lock:
+            self.values[label] = self.values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label, value in sorted(self.values.items(), key=lambda item: str(item[0])):
+            labels = [(self.label_name, label)] if self.label_name else []
+            lines.append(f"{self.name}{_labels(labels)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text, getter):
+        self.name = name
+        self.help = help_text
+        self.getter = getter
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_number(self.getter())}"]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            cumulative = 0
+            for bound, count in zip(self.buckets, self.counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels([('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum {_number(self.sum)}")
+            lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class EngineMetrics:
+    def __init__(self, engine):
+        self.requests = Counter("ai_requests_total", "Completion requests by result", label_name="result")
+        self.queue_wait = Histogram("ai_queue_wait_seconds", "Time spent waiting for an inference slot", LATENCY_BUCKETS)
+        self.prompt_eval = Histogram("ai_prompt_eval_seconds", "Prompt evaluation time (until first token)", LATENCY_BUCKETS)
+        self.decode = Histogram("ai_decode_seconds", "Token generation time after the first token", LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram("ai_prompt_tokens", "Prompt tokens per request", TOKEN_BUCKETS)
+        self.generated_tokens = Histogram("ai_generated_tokens", "Generated tokens per request", TOKEN_BUCKETS)
+        self.tokens_per_second = Histogram("ai_decode_tokens_per_second", "Decode speed per request", RATE_BUCKETS)
+        self.slot_occupancy = Histogram(
+            "ai_slots_in_use", "Busy inference slots when a request starts", tuple(range(1, 17))
+        )
+        self.instruments = [
+            self.requests, self.queue_wait, self.prompt_eval, self.decode,
+            self.prompt_tokens, self.generated_tokens, self.tokens_per_second, self.slot_occupancy,
+            Gauge("ai_queue_depth", "Requests waiting for an inference slot", lambda: engine.waiting),
+            Gauge("ai_slots_busy", "Inference slots currently running", lambda: engine.in_use),
+            Gauge("ai_slots_active", "Inference slots enabled by the adaptive controller", lambda: engine.limit),
+        ]
+
+    def observe(self, timings):
+        self.queue_wait.observe(timings["queue_wait"])
+        self.prompt_eval.observe(timings["prompt_eval"])
+        self.decode.observe(timings["decode"])
+        self.prompt_tokens.observe(timings["prompt_tokens"])
+        self.generated_tokens.observe(timings["generated_tokens"])
+        if timings["tokens_per_second"]:
+            self.tokens_per_second.observe(timings["tokens_per_second"])
+
+    def render(self):
+        lines = []
+        for instrument in self.instruments:
+            lines.extend(instrument.render())
+        return "\n".join(lines) + "\n"
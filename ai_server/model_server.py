@@ -0,0 +1,110 @@
+"""
+모델 전용 프로세스
+
+GGUF 모델을 한 번만 로드하고(모든 코어 사용), uvicorn HTTP 워커들이 보내는 요청을
+Unix 소켓으로 받아 순차 처리한다.
+
+    python model_server.py
+    uvicorn main:app --workers 2   (AI_BACKEND=ipc, 같은 MODEL_SOCKET)
+
+docker-compose 에서는 ai_model / ai_server 서비스로 나눠 소켓 볼륨을 공유하고,
+모델 프로세스가 죽으면 restart 로 다시 띄운다.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+
+from engine import SOCKET_PATH, LocalEngine, Overloaded
+from tuning import ModelConfig
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("model_server")
+
+
+class ModelServer:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def _complete(self, req, reader):
+        cancel = threading.Event()
+        task = asyncio.ensure_future(self.engine.complete(
+            req["prompt"],
+            max_tokens=req.get("max_tokens", 256),
+            stop=req.get("stop"),
+            temperature=req.get("temperature", 0.1),
+            timeout=req.get("timeout"),
+            cancel=cancel,
+        ))
+        # HTTP 워커가 소켓을 닫으면(클라이언트 연결 끊김/타임아웃) 대기 중이든 생성 중이든 중단
+        closed = asyncio.ensure_future(reader.read(1))
+        done, _ = await asyncio.wait({task, closed}, return_when=asyncio.FIRST_COMPLETED)
+        if task not in done:
+            cancel.set()
+            task.cancel()
+            return None
+        closed.cancel()
+        return task.result()
+
+    async def _dispatch(self, req, reader):
+        op = req.get("op", "completion")
+        if op == "ping":
+            return {"ok": True}
+        if op == "config":
+            return {"ok": True, **(await self.engine.describe())}
+        if op == "metrics":
+            return {"ok": True, "text": await self.engine.render_metrics()}
+        if op == "completion":
+            result = await self._complete(req, reader)
+            return {"ok": True, **result} if result is not None else None
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    async def handle(self, reader, writer):
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            try:
+                response = await self._dispatch(json.loads(line), reader)
+            except Overloaded as e:
+                response = {"ok": False, "error": "overloaded", "retry_after": e.retry_after}
+            except Exception as e:
+                logger.error(f"Request failed: {e}")
+                response = {"ok": False, "error": str(e)}
+
+            if response is None:
+                logger.info("Client disconnected, request dropped")
+                return
+            writer.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve():
+    model_path = os.getenv("MODEL_PATH")
+    # 모델 프로세스가 하나뿐이므로 모든 코어를 사용
+    config = ModelConfig.detect(workers=1)
+
+    if not model_path or not os.path.exists(model_path):
+        raise SystemExit(f"Model not found: {model_path}")
+
+    logger.info(f"Loading Model... ({config})")
+    engine = LocalEngine.load(model_path, config, adaptive=os.getenv("ADAPTIVE", "1") == "1")
+    logger.info("Model Loaded.")
+    # 워밍업이 끝난 뒤에 소켓을 열어야 워커의 /health 가 준비 완료로 응답
+    await engine.warm_up(model_path)
+
+    if os.path.exists(SOCKET_PATH):
+        os.unlink(SOCKET_PATH)
+    server = await asyncio.start_unix_server(ModelServer(engine).handle, path=SOCKET_PATH, limit=2 ** 20)
+    logger.info(f"Listening on {SOCKET_PATH}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,256 @@
+"""
+ai_server 단위 테스트 (모델 없이 실행)
+
+    cd ai_server && python -m unittest tests
+"""
+import asyncio
+import importlib.util
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from engine import IpcEngine, LocalEngine, Overloaded
+from metrics import EngineMetrics, Histogram
+from model_server import ModelServer
+from tuning import AdaptiveController, ModelConfig
+
+
+def make_config(max_slots=4, n_threads=8, gpu=False):
+    return ModelConfig(
+        n_ctx=2048, n_batch=512, n_threads=n_threads, n_gpu_layers=0,
+        max_slots=max_slots, cpu_cores=n_threads, gpu=gpu,
+    )
+
+
+class AdmissionTest(unittest.TestCase):
+    def make_engine(self, slots=2, max_queue=3):
+        engine = LocalEngine([object() for _ in range(slots)], make_config(max_slots=slots), max_queue=max_queue)
+        self.addCleanup(engine.close)
+        return engine
+
+    def test_estimate_wait_counts_queue_per_slot(self):
+        engine = self.make_engine()
+        engine.service_time = 2.0
+        self.assertEqual(engine.estimate_wait(), 0.0)
+
+        engine.free = []
+        engine.waiting = 3
+        # (3 + 1) / 2 슬롯 = 2 라운드
+        self.assertEqual(engine.estimate_wait(), 4.0)
+
+    def test_full_queue_is_shed_with_retry_after(self):
+        engine = self.make_engine(max_queue=3)
+        engine.free = []
+        engine.waiting = 3
+        engine.service_time = 1.5
+
+        with self.assertRaises(Overloaded) as raised:
+            engine._admit(timeout=None)
+        self.assertEqual(raised.exception.retry_after, 3.0)
+        self.assertEqual(engine.metrics.requests.values["overloaded"], 1)
+
+    def test_request_that_cannot_finish_before_client_timeout_is_shed(self):
+        engine = self.make_engine()
+        engine.free = []
+        engine.waiting = 1
+        engine.service_time = 2.0
+
+        # 대기 2초 + 처리 2초 > 3초
+        with self.assertRaises(Overloaded):
+            engine._admit(timeout=3.0)
+        engine._admit(timeout=5.0)
+
+    def test_queued_request_times_out_without_leaking_slot(self):
+        engine = self.make_engine(slots=1)
+
+        async def scenario():
+            held = await engine._acquire()
+            with self.assertRaises(Overloaded):
+                await engine._acquire(timeout=0.05)
+            await engine._release(held)
+            return await engine._acquire(timeout=0.05)
+
+        self.assertIsNotNone(asyncio.run(scenario()))
+        self.assertEqual((engine.waiting, engine.metrics.requests.values["timeout"]), (0, 1))
+
+
+class AdaptiveControllerTest(unittest.TestCase):
+    def adjust(self, controller, queue=0, tokens=0):
+        now = controller.last_adjusted + controller.interval + 1
+        controller.samples.clear()
+        if tokens:
+            controller.samples.append((now, tokens))
+        controller.observe_queue(queue)
+        controller.maybe_adjust(now)
+
+    def test_steps_up_when_queue_grows_and_back_down_when_throughput_flat(self):
+        controller = AdaptiveController(make_config(max_slots=4, n_threads=8), interval=10.0)
+        self.assertEqual((controller.active, controller.threads), (1, 8))
+
+        self.adjust(controller, queue=3, tokens=100)
+        self.assertEqual((controller.active, controller.threads), (2, 4))
+
+        # 슬롯을 늘렸는데 처리량이 5% 이상 늘지 않으면 되돌리고 잠시 유지
+        self.adjust(controller, queue=3, tokens=102)
+        self.assertEqual(controller.active, 1)
+        self.assertEqual(controller.hold, AdaptiveController.HOLD_INTERVALS)
+        self.adjust(controller, queue=3, tokens=100)
+        self.assertEqual(controller.active, 1)
+
+    def test_steps_down_when_idle(self):
+        controller = AdaptiveController(make_config(max_slots=4), interval=10.0)
+        controller.active = 3
+
+        self.adjust(controller, queue=0)
+        self.assertEqual(controller.active, 2)
+
+    def test_disabled_with_single_slot(self):
+        controller = AdaptiveController(make_config(max_slots=1))
+        self.adjust(controller, queue=10, tokens=100)
+        self.assertEqual((controller.enabled, controller.active), (False, 1))
+
+
+class MetricsTest(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram("ai_test_seconds", "test", (1, 5))
+        for value in (0.5, 2, 10):
+            histogram.observe(value)
+        lines = histogram.render()
+
+        self.assertIn('ai_test_seconds_bucket{le="1"} 1', lines)
+        self.assertIn('ai_test_seconds_bucket{le="5"} 2', lines)
+        self.assertIn('ai_test_seconds_bucket{le="+Inf"} 3', lines)
+        self.assertIn("ai_test_seconds_count 3", lines)
+
+    def test_engine_metrics_render(self):
+        metrics = EngineMetrics(SimpleNamespace(waiting=2, in_use=1, limit=3))
+        metrics.requests.inc("ok")
+        metrics.requests.inc("overloaded", 2)
+        text = metrics.render()
+
+        self.assertIn('ai_requests_total{result="ok"} 1', text)
+        self.assertIn('ai_requests_total{result="overloaded"} 2', text)
+        self.assertIn("ai_queue_depth 2", text)
+        self.assertIn("ai_slots_active 3", text)
+        self.assertTrue(text.endswith("\n"))
+
+
+class FakeEngine:
+    """ModelServer 뒤에서 LocalEngine 대신 쓰는 엔진 (complete 는 error 가 있으면 그 예외)"""
+
+    def __init__(self, error=None, hang=False):
+        self.error = error
+        self.hang = hang
+        self.started = asyncio.Event()
+        self.cancel = None
+
+    async def complete(self, prompt, max_tokens=256, stop=None, temperature=0.1, timeout=None, cancel=None):
+        self.cancel = cancel
+        self.started.set()
+        if self.error:
+            raise self.error
+        if self.hang:
+            await asyncio.Event().wait()
+        return {"text": prompt, "max_tokens": max_tokens, "stop": stop}
+
+    async def describe(self):
+        return {"ready": True}
+
+    async def render_metrics(self):
+        return "ai_queue_depth 0\n"
+
+
+class IpcRoundTripTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.socket_path = os.path.join(directory.name, "model.sock")
+        self.client = IpcEngine(self.socket_path)
+
+    async def serve(self, handler):
+        server = await asyncio.start_unix_server(handler, path=self.socket_path)
+        self.addAsyncCleanup(server.wait_closed)
+        self.addCleanup(server.close)
+
+    async def test_completion_and_ops_round_trip(self):
+        await self.serve(ModelServer(FakeEngine()).handle)
+
+        result = await self.client.complete("안녕", max_tokens=8)
+        self.assertEqual(result, {"text": "안녕", "max_tokens": 8, "stop": ["<|im_end|>"]})
+        self.assertEqual(await self.client.describe(), {"ready": True})
+        self.assertEqual(await self.client.render_metrics(), "ai_queue_depth 0\n")
+        self.assertTrue(await self.client.ping())
+
+    async def test_errors_are_mapped(self):
+        await self.serve(ModelServer(FakeEngine(error=Overloaded(2.5))).handle)
+        with self.assertRaises(Overloaded) as raised:
+            await self.client.complete("x")
+        self.assertEqual(raised.exception.retry_after, 2.5)
+
+    async def test_model_error_raises_runtime_error(self):
+        await self.serve(ModelServer(FakeEngine(error=ValueError("bad prompt"))).handle)
+        with self.assertRaisesRegex(RuntimeError, "bad prompt"):
+            await self.client.complete("x")
+
+    async def test_client_disconnect_cancels_generation(self):
+        engine = FakeEngine(hang=True)
+        await self.serve(ModelServer(engine).handle)
+
+        task = asyncio.ensure_future(self.client.complete("x"))
+        await asyncio.wait_for(engine.started.wait(), 1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+
+        # 소켓이 닫히면 (EOF) 모델 서버가 생성 중단 신호를 보냄
+        for _ in range(100):
+            if engine.cancel.is_set():
+                break
+            await asyncio.sleep(0.01)
+        self.assertTrue(engine.cancel.is_set())
+
+    async def test_server_closing_without_reply_is_connection_error(self):
+        async def hang_up(reader, writer):
+            await reader.readline()
+            writer.close()
+
+        await self.serve(hang_up)
+        with self.assertRaises(ConnectionError):
+            await self.client.complete("x")
+
+    async def test_missing_socket_is_os_error(self):
+        # 모델 서버가 아직 뜨지 않았거나 재시작 중 -> main 에서 503
+        with self.assertRaises(OSError):
+            await self.client.complete("x")
+        self.assertFalse(await self.client.ping())
+
+
+@unittest.skipIf(importlib.util.find_spec("fastapi") is None, "fastapi not installed")
+class RunCompletionTest(unittest.TestCase):
+    def call(self, error):
+        import main
+        from fastapi import HTTPException
+
+        class FailingEngine:
+            async def complete(self, *args, **kwargs):
+                raise error
+
+        request = SimpleNamespace(headers={}, is_disconnected=lambda: asyncio.sleep(0, False))
+        with patch.object(main, "engine", FailingEngine()):
+            with self.assertRaises(HTTPException) as raised:
+                asyncio.run(main.run_completion(request, "prompt", 16, None, 0.1))
+        return raised.exception
+
+    def test_overloaded_returns_503_with_retry_after(self):
+        error = self.call(Overloaded(2.2))
+        self.assertEqual((error.status_code, error.headers["Retry-After"]), (503, "3"))
+
+    def test_model_server_unavailable_returns_503(self):
+        for error in (RuntimeError("Model server error"), ConnectionRefusedError(), FileNotFoundError()):
+            self.assertEqual(self.call(error).status_code, 503)
+
+
+if __name__ == "__main__":
+    unittest.main()
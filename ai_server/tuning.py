@@ -0,0 +1,159 @@
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+
+logger = logging.getLogger(__name__)
+
+
+def cpu_count():
+    try:
+        n = len(os.sched_getaffinity(0))
+    except AttributeError:
+        n = os.cpu_count() or 1
+
+    # 컨테이너 CPU 제한 반영 (cgroup v2)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            n = min(n, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return n
+
+
+def has_gpu():
+    try:
+        import llama_cpp
+        if not llama_cpp.llama_supports_gpu_offload():
+            return False
+    except (ImportError, AttributeError):
+        return False
+    return os.path.exists("/dev/nvidia0")
+
+
+@dataclass
+class ModelConfig:
+    n_ctx: int
+    n_batch: int
+    n_threads: int      # 슬롯 1개가 쓸 수 있는 최대 스레드 수
+    n_gpu_layers: int
+    max_slots: int      # 동시에 추론할 수 있는 컨텍스트(슬롯) 수
+    cpu_cores: int
+    gpu: bool
+    mlock: bool = False  # 가중치를 RAM에 고정 (컨테이너에 memlock ulimit 필요)
+
+    @classmethod
+    def detect(cls, workers=1):
+        """하드웨어를 감지해 기본값을 정하고, 환경 변수가 있으면 그 값을 우선 사용"""
+        cores = max(1, cpu_count() // max(1, workers))
+
+        gpu_layers_env = os.getenv("N_GPU_LAYERS", "auto")
+        if gpu_layers_env == "auto":
+            gpu = has_gpu()
+            n_gpu_layers = -1 if gpu else 0
+        else:
+            n_gpu_layers = int(gpu_layers_env)
+            gpu = n_gpu_layers != 0
+
+        if gpu:
+            # 가중치가 VRAM에 올라가므로 컨텍스트 1개 + 큰 배치 (CPU 스레드는 거의 쓰지 않음)
+            defaults = {"n_batch": 1024, "n_threads": min(cores, 4), "max_slots": 1}
+        else:
+            # mmap으로 가중치는 공유되고 슬롯마다 KV 캐시만 추가됨. 슬롯당 최소 2스레드
+            defaults = {"n_batch": 512, "n_threads": cores, "max_slots": max(1, cores // 2)}
+
+        return cls(
+            n_ctx=int(os.getenv("N_CTX", "2048")),
+            n_batch=int(os.getenv("N_BATCH", defaults["n_batch"])),
+            n_threads=int(os.getenv("N_THREADS", defaults["n_threads"])),
+            n_gpu_layers=n_gpu_layers,
+            max_slots=int(os.getenv("MAX_CONCURRENCY", defaults["max_slots"])),
+            cpu_cores=cores,
+            gpu=gpu,
+            mlock=os.getenv("MODEL_MLOCK", "0") == "1",
+        )
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class AdaptiveController:
+    """
+    대기열 길이와 tokens/sec 를 관찰해 활성 슬롯 수(동시성)와 슬롯당 스레드를 조정한다.
+    - 한가할 때: 슬롯 1개에 모든 코어 (요청 1건의 지연 최소화)
+    - 밀릴 때: 슬롯을 늘려 코어를 나눔 (처리량 우선). 처리량이 늘지 않으면 되돌림
+    """
+
+    HOLD_INTERVALS = 6  # 되돌린 뒤 다시 늘리기 전까지 쉬는 주기 수
+
+    def __init__(self, config, interval=10.0, enabled=True):
+        self.config = config
+        self.interval = interval
+        self.enabled = enabled and config.max_slots > 1
+        self.active = 1 if self.enabled else config.max_slots
+        self.samples = deque()  # (완료 시각, 생성 토큰 수)
+        self.max_queue = 0
+        self.last_tps = None
+        self.last_step = 0
+        self.hold = 0
+        self.last_adjusted = time.monotonic()
+
+    @property
+    def threads(self):
+        if self.config.gpu:
+            return self.config.n_threads
+        return max(1, self.config.n_threads // self.active)
+
+    def observe_queue(self, depth):
+        self.max_queue = max(self.max_queue, depth)
+
+    def record(self, tokens):
+        now = time.monotonic()
+        self.samples.append((now, tokens))
+        self.maybe_adjust(now)
+
+    def tokens_per_sec(self, now=None):
+        now = now or time.monotonic()
+        while self.samples and self.samples[0][0] < now - self.interval:
+            self.samples.popleft()
+        return sum(tokens for _, tokens in self.samples) / self.interval
+
+    def maybe_adjust(self, now=None):
+        now = now or time.monotonic()
+        if not self.enabled or now - self.last_adjusted < self.interval:
+            return
+
+        tps = self.tokens_per_sec(now)
+        queue, self.max_queue = self.max_queue, 0
+        self.last_adjusted = now
+
+        if self.last_step > 0 and self.last_tps and tps < self.last_tps * 1.05:
+            # 슬롯을 늘렸는데 처리량이 늘지 않음 -> 되돌리고 잠시 유지
+            step = -1
+            self.hold = self.HOLD_INTERVALS
+        elif self.hold > 0:
+            self.hold -= 1
+            step = 0
+        elif queue > self.active and self.active < self.config.max_slots:
+            step = 1
+        elif queue == 0 and self.active > 1:
+            step = -1
+        else:
+            step = 0
+
+        self.last_tps = tps
+        self.last_step = step
+        if step:
+            self.active += step
+            logger.info(f"Adaptive: slots={self.active} threads={self.threads} (queue={queue}, {tps:.1f} tok/s)")
+
+    def to_dict(self):
+        return {
+            "adaptive": self.enabled,
+            "active_slots": self.active,
+            "threads_per_slot": self.threads,
+            "tokens_per_sec": round(self.tokens_per_sec(), 2),
+        }
@@ -0,0 +1,51 @@
+"""
+사용자별 찜 병원(hpid) 집합
+
+목록 API 가 병원마다 Exists 서브쿼리를 돌리지 않도록 사용자별 hpid 집합을 캐시(Redis)에 두고,
+찜 추가/삭제 시 해당 사용자 키만 지운다.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import BookMark, Hospital
+
+CACHE_KEY = 'bookmarks:user:{}'
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def bookmarked_hpids(user_id):
+    key = CACHE_KEY.format(user_id)
+    hpids = cache.get(key)
+    if hpids is None:
+        hpids = frozenset(BookMark.objects.filter(user_id=user_id).values_list('hospital_id', flat=True))
+        cache.set(key, hpids, CACHE_TIMEOUT)
+    return hpids
+
+
+def invalidate(user_id):
+    cache.delete(CACHE_KEY.format(user_id))
+
+
+def invalidate_on_commit(user_id):
+    """
+    찜 변경이 커밋된 뒤에 캐시를 지움.
+    커밋 전에 지우면 다른 요청이 아직 반영 안 된 집합으로 캐시를 다시 채워 하루 동안 남을 수 있음
+    """
+    transaction.on_commit(lambda: invalidate(user_id))
+
+
+def add_bookmarks(user, hpids):
+    """존재하는 병원만 한 번에 추가 (이미 찜한 병원은 무시) -> 실제 존재하는 hpid 집합"""
+    valid = set(Hospital.objects.filter(hpid__in=hpids).values_list('hpid', flat=True))
+    BookMark.objects.bulk_create(
+        [BookMark(user=user, hospital_id=hpid) for hpid in valid],
+        ignore_conflicts=True,
+    )
+    invalidate_on_commit(user.id)
+    return valid
+
+
+def remove_bookmarks(user, hpids):
+    deleted, _ = BookMark.objects.filter(user=user, hospital_id__in=hpids).delete()
+    invalidate_on_commit(user.id)
+    return deleted
@@ -81,6 +81,10 @@ class InferenceEngine:
             print(f"❌ JSON Parsing Error: {e} | Raw Content: {response_content}")
             return {}, used_model
 
+    def _post(self, url, payload, timeout):
+        # 남은 대기 가능 시간을 전달 -> 서버가 시간 안에 못 끝낼 요청은 즉시 503(Retry-After)으로 거절
+        return requests.post(url, json=payload, timeout=timeout, headers={"X-Request-Timeout": str(timeout)})
+
     def _call_llama_server(self, prompt, max_tokens=256, temperature=0.7):
         payload = {
             "prompt": prompt,
@@ -98,7 +102,7 @@ class InferenceEngine:
             try:
                 base_url = self.gpu_api_url.rstrip('/')
                 url = f"{base_url}/completion" if not base_url.endswith('/completion') else base_url
-                response = requests.post(url, json=payload, timeout=10)
+                response = self._post(url, payload, timeout=10)
                 response.raise_for_status()
                 return response.json().get("content", ""), "GPU"
             except Exception as e:
@@ -108,7 +112,7 @@ class InferenceEngine:
         # 2. ONLY_CPU 모드
         elif self.mode == 'ONLY_CPU':
             try:
-                response = requests.post(f"{self.api_url}/completion", json=payload, timeout=20)
+                response = self._post(f"{self.api_url}/completion", payload, timeout=20)
                 response.raise_for_status()
                 return response.json().get("content", ""), "CPU"
             except Exception as e:
@@ -118,7 +122,7 @@ class InferenceEngine:
         # 3. HYBRID_SPOT 모드
         elif self.mode == 'HYBRID_SPOT':
             try:
-                response = requests.post(f"{self.api_url}/completion", json=payload, timeout=5)
+                response = self._post(f"{self.api_url}/completion", payload, timeout=5)
                 if response.status_code == 503:
                     raise requests.exceptions.RequestException("Local Server Busy")
                 response.raise_for_status()
@@ -129,7 +133,7 @@ class InferenceEngine:
                     try:
                         base_url = self.gpu_api_url.rstrip('/')
                         url = f"{base_url}/completion" if not base_url.endswith('/completion') else base_url
-                        response = requests.post(url, json=payload, timeout=5)
+                        response = self._post(url, payload, timeout=5)
                         response.raise_for_status()
                         return response.json().get("content", ""), "GPU"
                     except Exception as gpu_e:
@@ -140,7 +144,7 @@ class InferenceEngine:
         else:
             # Fallback (기존 로직)
             try:
-                response = requests.post(f"{self.api_url}/completion", json=payload, timeout=20)
+                response = self._post(f"{self.api_url}/completion", payload, timeout=20)
                 response.raise_for_status()
                 return response.json().get("content", ""), "CPU"
             except:
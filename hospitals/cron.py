@@ -26,4 +26,31 @@ class ResetApiLimitsCronJob(CronJobBase):
     code = 'hospitals.reset_api_limits_cron'
 
     def do(self):
-        call_command('reset_api_limits')
\ No newline at end of file
+        call_command('reset_api_limits')
+
+class PruneBedHistoryCronJob(CronJobBase):
+    RUN_AT_TIMES = ['04:00']
+
+    schedule = Schedule(run_at_times=RUN_AT_TIMES)
+    code = 'hospitals.prune_bed_history_cron'
+
+    def do(self):
+        call_command('prune_bed_history')
+
+class ManageLogPartitionsCronJob(CronJobBase):
+    RUN_AT_TIMES = ['03:30']
+
+    schedule = Schedule(run_at_times=RUN_AT_TIMES)
+    code = 'hospitals.manage_log_partitions_cron'
+
+    def do(self):
+        call_command('manage_log_partitions')
+
+class RollupLogsCronJob(CronJobBase):
+    RUN_EVERY_MINS = 10
+
+    schedule = Schedule(run_every_mins=RUN_EVERY_MINS)
+    code = 'hospitals.rollup_logs_cron'
+
+    def do(self):
+        call_command('rollup_logs')
@@ -0,0 +1,94 @@
+"""
+응급실 가용 병상(hvec) 예측
+
+병원별로 요일x시간대마다 hvec 의 지수가중평균(EWMA)을 유지하고,
+"현재 값 + (도착 시각 시간대 평균 - 현재 시간대 평균)" 으로 도착 시점의 병상 수를 추정한다.
+각 시간대는 끝난 시간의 평균(HospitalBedHourly)으로 한 번만 갱신하므로 EWMA 는 주 단위로 쌓인다.
+갱신은 동기화마다 SQL 한 번 (이미 반영한 시간은 건너뜀), 조회는 추천 요청마다 후보 병원 전체를 쿼리 한 번으로 처리.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import BED_HISTORY_FIELDS, HospitalBedForecast, HospitalBedHourly
+
+# 같은 요일/시간대에 주 1회 반영 -> 0.2 면 최근 약 5주가 대부분
+ALPHA = getattr(settings, 'BED_FORECAST_ALPHA', 0.2)
+# 이 주 수만큼 쌓이기 전의 시간대 평균은 믿지 않음
+MIN_SAMPLES = 3
+# 동기화가 멈췄다가 재개된 경우 이만큼 지난 시간까지 거슬러 반영
+CATCH_UP_HOURS = 24
+# 구급차 평균 속도 (km/h) - 직선거리로 도착 예정 시각 추정
+AMBULANCE_SPEED_KMH = 40
+
+
+def hour_of_week(when):
+    when = timezone.localtime(when)
+    return when.weekday() * 24 + when.hour
+
+
+def update_forecast(now=None):
+    """
+    끝난 시간(현재 시각 이전)의 시간 평균 hvec 을 해당 요일x시간대 EWMA 에 반영.
+    last_hour 로 이미 반영한 시간은 건너뛰므로 5분마다 호출해도 시간대마다 한 번만 갱신됨
+    """
+    now = now or timezone.now()
+    current_hour = now.replace(minute=0, second=0, microsecond=0)
+    hvec = BED_HISTORY_FIELDS.index('hvec') + 1 # Postgres 배열은 1부터
+    sql = f"""
+        INSERT INTO {HospitalBedForecast._meta.db_table} AS t (hospital_id, hour_of_week, level, samples, last_hour, updated_at)
+        SELECT hospital_id,
+               ((EXTRACT(ISODOW FROM hour AT TIME ZONE %s) - 1) * 24 + EXTRACT(HOUR FROM hour AT TIME ZONE %s))::smallint,
+               GREATEST(sums[{hvec}]::float / samples, 0), 1, hour, %s
+        FROM {HospitalBedHourly._meta.db_table}
+        WHERE hour >= %s AND hour < %s AND samples > 0
+        ON CONFLICT (hospital_id, hour_of_week) DO UPDATE SET
+            level = t.level + %s * (EXCLUDED.level - t.level),
+            samples = t.samples + 1,
+            last_hour = EXCLUDED.last_hour,
+            updated_at = EXCLUDED.updated_at
+        WHERE t.last_hour IS NULL OR t.last_hour < EXCLUDED.last_hour
+    """
+    tz = timezone.get_current_timezone_name()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tz, tz, now, current_hour - timedelta(hours=CATCH_UP_HOURS), current_hour, ALPHA])
+        return cursor.rowcount
+
+
+def eta_minutes(distance_km):
+    return distance_km / AMBULANCE_SPEED_KMH * 60
+
+
+def predict_hvec(candidates, now=None):
+    """
+    candidates: [(hpid, 현재 hvec, 거리 km)] -> {hpid: 도착 시점 예상 hvec}
+    시간대 평균이 충분히 쌓이지 않은 병원은 현재 값을 그대로 쓴다.
+    """
+    now = now or timezone.now()
+    current_how = hour_of_week(now)
+    eta_how = {
+        hpid: hour_of_week(now + timedelta(minutes=eta_minutes(distance)))
+        for hpid, _, distance in candidates
+    }
+
+    levels = {}
+    rows = HospitalBedForecast.objects.filter(
+        hospital_id__in=eta_how.keys(),
+        hour_of_week__in={current_how, *eta_how.values()},
+        samples__gte=MIN_SAMPLES,
+    ).values_list('hospital_id', 'hour_of_week', 'level')
+    for hpid, how, level in rows:
+        levels[(hpid, how)] = level
+
+    predictions = {}
+    for hpid, hvec, _ in candidates:
+        current = max(hvec, 0)
+        now_level = levels.get((hpid, current_how))
+        eta_level = levels.get((hpid, eta_how[hpid]))
+        if now_level is None or eta_level is None:
+            predictions[hpid] = current
+        else:
+            predictions[hpid] = max(round(current + eta_level - now_level), 0)
+    return predictions
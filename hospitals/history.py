@@ -0,0 +1,81 @@
+"""
+실시간 병상 수 이력
+
+동기화가 끝날 때마다 HospitalRealtimeStatus 전체를 SQL 한 번으로
+원본 스냅샷(HospitalBedSample)에 추가하고 시간 단위 집계(HospitalBedHourly)에 누적한다.
+조회는 시간 단위 집계만 읽고, 원본은 짧게, 집계는 길게 보존한다.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import BED_HISTORY_FIELDS, HospitalBedHourly, HospitalBedSample, HospitalRealtimeStatus
+
+RAW_RETENTION_DAYS = getattr(settings, 'BED_HISTORY_RAW_DAYS', 2)
+HOURLY_RETENTION_DAYS = getattr(settings, 'BED_HISTORY_HOURLY_DAYS', 90)
+
+
+def _elementwise(expr, left, right):
+    # 두 배열을 같은 위치끼리 계산한 배열
+    return (
+        f"ARRAY(SELECT {expr} FROM unnest({left}, {right}) WITH ORDINALITY AS u(a, b, i) ORDER BY i)"
+    )
+
+
+def record_snapshot(captured_at=None):
+    captured_at = captured_at or timezone.now()
+    hour = captured_at.replace(minute=0, second=0, microsecond=0)
+    columns = ", ".join(BED_HISTORY_FIELDS)
+
+    sql = f"""
+        WITH snap AS (
+            SELECT hospital_id, ARRAY[{columns}]::smallint[] AS counts
+            FROM {HospitalRealtimeStatus._meta.db_table}
+        ), raw AS (
+            INSERT INTO {HospitalBedSample._meta.db_table} (hospital_id, captured_at, counts)
+            SELECT hospital_id, %s, counts FROM snap
+        )
+        INSERT INTO {HospitalBedHourly._meta.db_table} AS t (hospital_id, hour, samples, sums, mins, maxs, last)
+        SELECT hospital_id, %s, 1, counts::integer[], counts, counts, counts FROM snap
+        ON CONFLICT (hospital_id, hour) DO UPDATE SET
+            samples = t.samples + 1,
+            sums = {_elementwise('a + b', 't.sums', 'EXCLUDED.sums')},
+            mins = {_elementwise('LEAST(a, b)', 't.mins', 'EXCLUDED.mins')},
+            maxs = {_elementwise('GREATEST(a, b)', 't.maxs', 'EXCLUDED.maxs')},
+            last = EXCLUDED.last
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [captured_at, hour])
+        return cursor.rowcount
+
+
+def prune(now=None):
+    """보존기간이 지난 원본/집계 삭제 -> (원본 삭제 수, 집계 삭제 수)"""
+    now = now or timezone.now()
+    raw, _ = HospitalBedSample.objects.filter(captured_at__lt=now - timedelta(days=RAW_RETENTION_DAYS)).delete()
+    hourly, _ = HospitalBedHourly.objects.filter(hour__lt=now - timedelta(days=HOURLY_RETENTION_DAYS)).delete()
+    return raw, hourly
+
+
+def summarize(bucket, fields=BED_HISTORY_FIELDS):
+    """시간 단위 집계 한 줄 -> {"hour", 필드: {"avg", "min", "max", "last"}}"""
+    point = {"hour": bucket['hour'].isoformat()}
+    for field in fields:
+        i = BED_HISTORY_FIELDS.index(field)
+        point[field] = {
+            "avg": round(bucket['sums'][i] / bucket['samples'], 1) if bucket['samples'] else None,
+            "min": bucket['mins'][i],
+            "max": bucket['maxs'][i],
+            "last": bucket['last'][i],
+        }
+    return point
+
+
+def bed_curve(hpid, hours=24, fields=BED_HISTORY_FIELDS):
+    since = (timezone.now() - timedelta(hours=hours)).replace(minute=0, second=0, microsecond=0)
+    buckets = HospitalBedHourly.objects.filter(hospital_id=hpid, hour__gte=since).order_by('hour').values(
+        'hour', 'samples', 'sums', 'mins', 'maxs', 'last'
+    )
+    return [summarize(bucket, fields) for bucket in buckets]
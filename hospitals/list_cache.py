@@ -0,0 +1,120 @@
+"""
+HospitalListView 기본(비로그인) 응답 캐시
+
+시도(first_address)별로 버전을 두고, 버전이 같으면 응답 본문이 같으므로
+버전마다 한 번만 직렬화해 gzip 본문 + ETag 로 캐시에 둔다.
+동기화/리뷰 변경 시에는 바뀐 병원이 속한 시도만 버전을 올린다.
+로그인 사용자는 이 본문에 찜 여부(is_bookmarked)만 덧씌운다.
+"""
+import gzip
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import BooleanField, Count, Value
+
+from .models import Hospital
+
+OTHER_REGION = "기타" # first_address 가 비어 있는 병원
+GLOBAL_VERSION_KEY = 'hospitals:list:version'
+REGION_VERSION_KEY = 'hospitals:list:version:{}'
+CACHE_TIMEOUT = 60 * 60
+
+# 워커 프로세스별로 최근 버전의 파싱된 본문을 들고 있음 (찜 덧씌우기용)
+_local = {}
+LOCAL_MAX = 32
+
+
+def region_of(first_address):
+    return first_address or OTHER_REGION
+
+
+def _version(key):
+    # 키가 없거나 밀려난 경우에도 예전 본문을 다시 쓰지 않도록 새 값으로 시작
+    return cache.get_or_set(key, time.time_ns, None)
+
+
+def invalidate(regions=None):
+    """regions 가 없으면 전체, 있으면 해당 시도의 캐시만 무효화"""
+    if regions is None:
+        cache.set(GLOBAL_VERSION_KEY, time.time_ns(), None)
+        return
+    if regions:
+        cache.set_many({REGION_VERSION_KEY.format(region_of(r)): time.time_ns() for r in regions}, None)
+
+
+def region_index():
+    """[{"region", "count"}] - 시도 목록과 병원 수 (전체 버전이 바뀔 때만 다시 계산)"""
+    key = f'hospitals:regions:{_version(GLOBAL_VERSION_KEY)}'
+    regions = cache.get(key)
+    if regions is None:
+        counts = {}
+        for row in Hospital.objects.values('first_address').annotate(count=Count('hpid')).order_by('first_address'):
+            region = region_of(row['first_address'])
+            counts[region] = counts.get(region, 0) + row['count']
+        regions = [{"region": region, "count": count} for region, count in counts.items()]
+        cache.set(key, regions, CACHE_TIMEOUT)
+    return regions
+
+
+def generation(region=None):
+    base = _version(GLOBAL_VERSION_KEY)
+    if region is not None:
+        return f"{base}:{region}:{_version(REGION_VERSION_KEY.format(region))}"
+    # 전체 목록은 모든 시도 버전의 조합
+    keys = [REGION_VERSION_KEY.format(r['region']) for r in region_index()]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = _version(key)
+    combined = hashlib.md5(":".join(str(versions[key]) for key in keys).encode()).hexdigest()
+    return f"{base}:all:{combined}"
+
+
+def build_payload(serializer_class, context, region=None):
+    hospitals = Hospital.objects.annotate(
+        is_bookmarked=Value(False, output_field=BooleanField()),
+    ).order_by('first_address', 'name').prefetch_related('realtime_status')
+    if region is not None:
+        hospitals = hospitals.filter(first_address='' if region == OTHER_REGION else region)
+
+    grouped_data = {}
+    count = 0
+    for item in serializer_class(hospitals, many=True, context=context).data:
+        category = region_of(item.get('first_address'))
+        grouped_data.setdefault(category, []).append(item)
+        count += 1
+    return {"result": True, "count": count, "data": grouped_data}
+
+
+def get_rendered(serializer_class, context, region=None):
+    """-> (generation, etag, gzip 본문)"""
+    gen = generation(region)
+    key = f'hospitals:list:{gen}'
+    rendered = cache.get(key)
+    if rendered is None:
+        body = json.dumps(build_payload(serializer_class, context, region), ensure_ascii=False, cls=DjangoJSONEncoder).encode('utf-8')
+        rendered = {'etag': hashlib.md5(body).hexdigest(), 'gzip': gzip.compress(body, compresslevel=6)}
+        cache.set(key, rendered, CACHE_TIMEOUT)
+    return gen, rendered['etag'], rendered['gzip']
+
+
+def get_payload(gen, body):
+    if gen not in _local:
+        if len(_local) >= LOCAL_MAX:
+            _local.clear()
+        _local[gen] = json.loads(gzip.decompress(body))
+    return _local[gen]
+
+
+def overlay_bookmarks(payload, hpids):
+    """찜한 병원만 is_bookmarked=True 로 바꾼 얕은 복사본 (캐시된 payload 는 건드리지 않음)"""
+    data = {}
+    for category, items in payload['data'].items():
+        data[category] = [
+            dict(item, is_bookmarked=True) if item.get('hpid') in hpids else item
+            for item in items
+        ]
+    return dict(payload, data=data)
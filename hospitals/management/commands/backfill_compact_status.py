@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from hospitals.models import HospitalRealtimeStatus, REALTIME_FLAG_FIELDS, REALTIME_COUNT_FIELDS, encode_compact
+
+
+class Command(BaseCommand):
+    help = "기존 hv* 컬럼 값으로 HospitalRealtimeStatus.flags / counts 를 채웁니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        names = REALTIME_FLAG_FIELDS + REALTIME_COUNT_FIELDS
+        rows = []
+        updated = 0
+        for status in HospitalRealtimeStatus.objects.only('pk', *names).iterator(chunk_size=options['batch_size']):
+            compact = encode_compact({name: getattr(status, name) for name in names})
+            status.flags = compact['flags']
+            status.counts = compact['counts']
+            rows.append(status)
+            if len(rows) >= options['batch_size']:
+                updated += HospitalRealtimeStatus.objects.bulk_update(rows, ['flags', 'counts'])
+                rows = []
+        if rows:
+            updated += HospitalRealtimeStatus.objects.bulk_update(rows, ['flags', 'counts'])
+
+        self.stdout.write(self.style.SUCCESS(f"Compact status backfilled: {updated} rows"))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hospitals.nmc import NMCClient
+from hospitals.sync import sync_realtime_status, sync_severe_messages
+
+
+class Command(BaseCommand):
+    help = "NMC 응급실 실시간 가용병상 정보와 중증질환 메시지를 전국 지역에서 동시에 수집해 DB에 반영합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="동시 요청 수 (기본: settings.NMC_FETCH_WORKERS 또는 8)")
+        parser.add_argument('--page-size', type=int, default=100, help="페이지당 item 수 (numOfRows)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        client = NMCClient(workers=options['workers'], page_size=options['page_size'])
+
+        writer = sync_realtime_status(client)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Realtime status synced: {writer.written} hospitals, {writer.changed} changed, "
+            f"{writer.unchanged} unchanged (unknown hpid skipped: {writer.skipped}) in {time.monotonic() - started:.1f}s"
+        ))
+
+        started = time.monotonic()
+        written, closed = sync_severe_messages(client)
+        self.stdout.write(self.style.SUCCESS(
+            f"Severe messages synced: {written} upserted, {closed} closed in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,202 @@
+import json
+import re
+import time
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from hospitals import list_cache
+from hospitals.models import Hospital
+from hospitals.recommend_cache import distance_km
+
+# 주소가 달라도 이 거리 안이면 같은 병원으로 봄 (주소 표기만 다른 경우)
+MAX_DISTANCE_KM = 1.0
+
+
+def iter_json_array(fp, chunk_size=64 * 1024):
+    """
+    최상위 배열 [ {...}, {...} ] 을 원소 단위로 하나씩 디코딩 (파일 전체를 한 번에 올리지 않음)
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        # 다음 원소 시작 위치까지 공백/구분자 건너뛰기
+        buffer = buffer.lstrip()
+        if not started:
+            if not buffer and not eof:
+                chunk = fp.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            if not buffer.startswith('['):
+                raise ValueError("JSON array expected")
+            buffer = buffer[1:]
+            started = True
+            continue
+        if buffer.startswith(','):
+            buffer = buffer[1:]
+            continue
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+            # 숫자처럼 버퍼 끝에서 끝난 원소는 다음 청크에 이어질 수 있음
+            complete = eof or end < len(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            # 원소가 청크 경계에 걸린 경우 더 읽어서 재시도
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def normalize(text):
+    return re.sub(r'[\s()]', '', text or '')
+
+
+def position(record):
+    """XPos/YPos -> (lon, lat), 없거나 숫자가 아니면 None"""
+    try:
+        return float(record.get('XPos')), float(record.get('YPos'))
+    except (TypeError, ValueError):
+        return None
+
+
+def road_address(addr):
+    # "경기도 수원시 팔달구 중부대로 93, (지동)" -> 도로명 주소 부분만
+    return normalize(re.sub(r'\(.*?\)', '', addr or '').split(',')[0])
+
+
+class Command(BaseCommand):
+    help = "hospitals.json (심평원 병원 기본정보)을 Hospital 과 이름/주소로 매칭해 위치, 전화번호, 종별을 일괄 반영합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='hospitals.json')
+        parser.add_argument('--dry-run', action='store_true', help="DB에 쓰지 않고 바뀔 내용만 출력")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        timings = {}
+        started = time.monotonic()
+
+        # 이름 -> 병원 목록, 도로명 주소 -> 병원 목록
+        by_name, by_address = {}, {}
+        hospitals = list(Hospital.objects.only('hpid', 'name', 'address', 'main_phone', 'category_name', 'latitude', 'longitude', 'location'))
+        for hospital in hospitals:
+            by_name.setdefault(normalize(hospital.name), []).append(hospital)
+            by_address.setdefault(road_address(hospital.address), []).append(hospital)
+        timings['index'] = time.monotonic() - started
+
+        started = time.monotonic()
+        changed = {}
+        matches = {} # hpid -> (병원, [record])
+        unmatched = ambiguous = skipped = 0
+        try:
+            fp = open(options['path'], encoding='utf-8')
+        except OSError as e:
+            raise CommandError(e)
+        with fp:
+            for record in iter_json_array(fp):
+                if position(record) is None:
+                    skipped += 1
+                    continue
+                hospital = self.match(record, by_name, by_address)
+                if hospital is None:
+                    unmatched += 1
+                    continue
+                if hospital is False:
+                    ambiguous += 1
+                    continue
+                matches.setdefault(hospital.hpid, (hospital, []))[1].append(record)
+
+        matched = 0
+        for hospital, records in matches.values():
+            # 여러 레코드가 같은 병원으로 매칭되면 어느 쪽이 맞는지 알 수 없으므로 반영하지 않음
+            if len(records) > 1:
+                ambiguous += len(records)
+                if options['dry_run']:
+                    self.stdout.write(self.style.WARNING(f"{hospital.hpid} {hospital.name}: {len(records)} records match, skipped"))
+                continue
+            matched += 1
+            diff = self.apply(hospital, records[0])
+            if diff:
+                changed[hospital.hpid] = (hospital, diff)
+        timings['parse+match'] = time.monotonic() - started
+
+        if options['dry_run']:
+            for hospital, diff in changed.values():
+                self.stdout.write(f"{hospital.hpid} {hospital.name}")
+                for field, (old, new) in diff.items():
+                    self.stdout.write(f"    {field}: {old!r} -> {new!r}")
+        else:
+            started = time.monotonic()
+            fields = sorted({field for _, diff in changed.values() for field in diff})
+            if 'latitude' in fields:
+                fields.append('location')
+            rows = [hospital for hospital, _ in changed.values()]
+            with transaction.atomic():
+                if rows:
+                    Hospital.objects.bulk_update(rows, fields, batch_size=options['batch_size'])
+            if rows:
+                list_cache.invalidate()
+            timings['write'] = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry-run] ' if options['dry_run'] else ''}matched {matched}, changed {len(changed)}, "
+            f"unmatched {unmatched}, ambiguous {ambiguous}, no position {skipped}"
+        ))
+        self.stdout.write(" / ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+
+    def match(self, record, by_name, by_address):
+        """
+        이름이 같고 도로명 주소가 같거나 좌표가 MAX_DISTANCE_KM 안인 병원.
+        이름이 같은 병원이 하나뿐이어도 확인 (다른 도시의 동명 병원). 못 찾으면 None, 구분 불가면 False
+        """
+        address = road_address(record.get('addr'))
+        candidates = [
+            h for h in by_name.get(normalize(record.get('yadmNm')), [])
+            if self.same_place(h, address, position(record))
+        ]
+        if not candidates:
+            # 이름이 바뀐 경우 주소가 유일하게 맞으면 매칭
+            candidates = by_address.get(address, []) if address else []
+        if len(candidates) > 1:
+            return False
+        return candidates[0] if candidates else None
+
+    def same_place(self, hospital, address, lon_lat):
+        if address and road_address(hospital.address) == address:
+            return True
+        if lon_lat is None or hospital.latitude is None or hospital.longitude is None:
+            return False
+        lon, lat = lon_lat
+        return distance_km(hospital.latitude, hospital.longitude, lat, lon) <= MAX_DISTANCE_KM
+
+    def apply(self, hospital, record):
+        """record 값을 hospital 에 반영하고 바뀐 필드만 {필드: (이전, 새 값)} 으로 반환"""
+        diff = {}
+        lon, lat = position(record)
+        if (
+            hospital.latitude is None or abs(hospital.latitude - lat) > 1e-7 or abs(hospital.longitude - lon) > 1e-7
+        ):
+            diff['latitude'] = (hospital.latitude, lat)
+            diff['longitude'] = (hospital.longitude, lon)
+            hospital.latitude, hospital.longitude = lat, lon
+            hospital.location = Point(lon, lat, srid=4326)
+
+        # 비어 있는 값만 채움 (NMC 쪽 값이 우선)
+        for field, key in (('main_phone', 'telno'), ('category_name', 'clCdNm')):
+            value = record.get(key)
+            if value and not getattr(hospital, field):
+                diff[field] = (getattr(hospital, field), value)
+                setattr(hospital, field, value)
+        return diff
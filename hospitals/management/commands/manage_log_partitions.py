@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hospitals.partitions import (
+    PARTITIONED_MODELS, RETENTION_MONTHS, archive_partitions, convert_table, ensure_partitions, is_partitioned,
+)
+
+
+class Command(BaseCommand):
+    help = "로그 테이블 월별 파티션을 미리 만들고, 보존 기간이 지난 파티션은 gzip CSV 로 내보낸 뒤 삭제합니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help="아직 일반 테이블이면 파티션 테이블로 변환 (테이블 잠금, 점검 시간에 실행)")
+        parser.add_argument('--months-ahead', type=int, default=3)
+        parser.add_argument('--retain-months', type=int, default=12, help="이 개월 수보다 오래된 파티션은 떼어냄 (0 이면 보관). 구급대원 인증 이력은 PARAMEDIC_AUTH_RETAIN_MONTHS")
+        parser.add_argument(
+            '--archive-dir', default=getattr(settings, 'LOG_ARCHIVE_DIR', None),
+            help="떼어낸 파티션을 저장할 디렉터리 (기본 LOG_ARCHIVE_DIR). 없으면 오래된 파티션을 삭제하지 않음",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="떼어낼 파티션만 출력")
+
+    def handle(self, *args, **options):
+        for model in PARTITIONED_MODELS:
+            table = model._meta.db_table
+
+            if options['convert'] and not options['dry_run'] and convert_table(model):
+                self.stdout.write(f"{table}: converted to monthly partitions")
+            if not is_partitioned(table):
+                self.stdout.write(self.style.WARNING(f"{table}: not partitioned (run with --convert)"))
+                continue
+
+            if not options['dry_run']:
+                for name in ensure_partitions(model, options['months_ahead']):
+                    self.stdout.write(f"{table}: created {name}")
+
+            retain_months = RETENTION_MONTHS.get(model, options['retain_months'])
+            if not retain_months or retain_months <= 0:
+                continue
+            if not options['archive_dir'] and not options['dry_run']:
+                self.stdout.write(self.style.WARNING(f"{table}: retention skipped (set LOG_ARCHIVE_DIR or --archive-dir)"))
+                continue
+            old = archive_partitions(model, retain_months, options['archive_dir'], options['dry_run'])
+            for name in old:
+                self.stdout.write(f"{table}: {'would detach' if options['dry_run'] else 'archived and dropped'} {name}")
+
+        self.stdout.write(self.style.SUCCESS("Log partitions up to date"))
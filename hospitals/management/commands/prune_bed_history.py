@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from hospitals.history import prune, RAW_RETENTION_DAYS, HOURLY_RETENTION_DAYS
+
+
+class Command(BaseCommand):
+    help = f"보존기간이 지난 병상 이력을 삭제합니다. (원본 {RAW_RETENTION_DAYS}일, 시간 단위 집계 {HOURLY_RETENTION_DAYS}일)"
+
+    def handle(self, *args, **options):
+        raw, hourly = prune()
+        self.stdout.write(self.style.SUCCESS(f"Bed history pruned: {raw} samples, {hourly} hourly buckets"))
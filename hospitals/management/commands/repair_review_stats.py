@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from hospitals import list_cache
+from hospitals.models import Hospital, Review
+from hospitals.review_stats import STAT_FIELDS, compute_review_stats
+
+
+class Command(BaseCommand):
+    help = "Hospital 의 리뷰 집계(review_count, rating_sum, rating_1~5)와 Review.comment_count 를 다시 계산해 어긋난 행만 고칩니다."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="고치지 않고 어긋난 병원만 출력")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # 집계 중에 리뷰 갱신이 끼어들지 않도록 잠금
+            hospitals = list(Hospital.objects.select_for_update().only('hpid', 'name', *STAT_FIELDS))
+            stats = compute_review_stats()
+            empty = dict.fromkeys(STAT_FIELDS, 0)
+
+            fixed = []
+            for hospital in hospitals:
+                expected = stats.get(hospital.hpid, empty)
+                diff = {field: (getattr(hospital, field), expected[field]) for field in STAT_FIELDS if getattr(hospital, field) != expected[field]}
+                if not diff:
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(f"{hospital.hpid} {hospital.name}: " + ", ".join(f"{f} {old} -> {new}" for f, (old, new) in diff.items()))
+                for field, (_, new) in diff.items():
+                    setattr(hospital, field, new)
+                fixed.append(hospital)
+
+            if fixed and not options['dry_run']:
+                Hospital.objects.bulk_update(fixed, STAT_FIELDS, batch_size=500)
+                list_cache.invalidate()
+
+            # 댓글 수가 어긋난 리뷰만 (HAVING comment_count <> COUNT(comments))
+            reviews = list(
+                Review.objects.annotate(actual=Count('comments')).filter(~Q(comment_count=F('actual'))).only('id', 'comment_count')
+            )
+            for review in reviews:
+                if options['dry_run']:
+                    self.stdout.write(f"review {review.id}: comment_count {review.comment_count} -> {review.actual}")
+                review.comment_count = review.actual
+            if reviews and not options['dry_run']:
+                Review.objects.bulk_update(reviews, ['comment_count'], batch_size=500)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{'[dry-run] ' if options['dry_run'] else ''}Review stats checked: {len(hospitals)} hospitals, {len(fixed)} out of sync, "
+            f"{len(reviews)} reviews with wrong comment_count"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from hospitals.rollups import rollup
+
+
+class Command(BaseCommand):
+    help = "검색/위치 로그 중 아직 집계하지 않은 행을 시간 단위 집계 테이블에 더합니다."
+
+    def handle(self, *args, **options):
+        for source, last_id in rollup().items():
+            if last_id is None:
+                self.stdout.write(f"{source}: nothing new")
+            else:
+                self.stdout.write(f"{source}: rolled up to id {last_id}")
+        self.stdout.write(self.style.SUCCESS("Log rollups up to date"))
@@ -1,5 +1,9 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.lookups import Exact
 from django.contrib.gis.db import models as gis_models
+from django.contrib.postgres.fields import ArrayField
+from django.utils import timezone
 from accounts.models import User
 import json
 import uuid
@@ -26,6 +30,23 @@ class Hospital(models.Model):
     description = models.TextField(blank=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # 리뷰 집계 (리뷰 작성/수정/삭제 시 review_stats 에서 F() 로 갱신, 어긋나면 repair_review_stats)
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+    rating_1 = models.IntegerField(default=0)
+    rating_2 = models.IntegerField(default=0)
+    rating_3 = models.IntegerField(default=0)
+    rating_4 = models.IntegerField(default=0)
+    rating_5 = models.IntegerField(default=0)
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else None
+
+    @property
+    def rating_histogram(self):
+        return {score: getattr(self, f'rating_{score}') for score in range(1, 6)}
+
     def __str__(self):
         return f"[{self.hpid}] {self.name}"
 
@@ -34,9 +55,15 @@ class Review(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='hospital_reviews')
     content = models.TextField()
     rating = models.IntegerField(default=5) # 1~5점
+    comment_count = models.IntegerField(default=0) # 댓글 작성/삭제 시 F() 로 갱신
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['hospital', '-created_at', '-id'], name='review_hospital_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.hospital.name} - {self.user.name}"
 
@@ -47,9 +74,68 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['review', 'created_at', 'id'], name='comment_review_created_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.user.name}"
 
+# flags / counts 의 비트, 인덱스 순서 (저장된 값의 의미가 바뀌므로 새 필드는 끝에만 추가)
+REALTIME_FLAG_FIELDS = [
+    'hv10', 'hv11', 'hv42', 'hv5', 'hv7', 'hvamyn', 'hvangioayn', 'hvcrrtayn', 'hvctayn', 'hvecmoayn',
+    'hvhypoayn', 'hvincuayn', 'hvmriayn', 'hvoxyayn', 'hvventiayn', 'hvventisoayn',
+]
+REALTIME_COUNT_FIELDS = [
+    'hv13', 'hv14', 'hv18', 'hv2', 'hv24', 'hv25', 'hv27', 'hv28', 'hv29', 'hv3', 'hv30', 'hv31',
+    'hv34', 'hv35', 'hv36', 'hv38', 'hv40', 'hv41', 'hvec', 'hvgc', 'hvcc', 'hvccc', 'hvicc', 'hvncc',
+    'hvoc', 'hvs01', 'hvs02', 'hvs03', 'hvs04', 'hvs05', 'hvs06', 'hvs07', 'hvs08', 'hvs15', 'hvs18',
+    'hvs19', 'hvs21', 'hvs22', 'hvs24', 'hvs25', 'hvs26', 'hvs27', 'hvs28', 'hvs29', 'hvs30', 'hvs31',
+    'hvs32', 'hvs33', 'hvs34', 'hvs35', 'hvs38', 'hvs46', 'hvs47', 'hvs51', 'hvs56', 'hvs57', 'hvs59',
+]
+
+def flag_mask(*names):
+    mask = 0
+    for name in names:
+        mask |= 1 << REALTIME_FLAG_FIELDS.index(name)
+    return mask
+
+def encode_compact(values):
+    """hv* 값(dict) -> {"flags": Y 인 필드의 비트, "counts": 병상 수 배열}"""
+    flags = flag_mask(*[name for name in REALTIME_FLAG_FIELDS if str(values.get(name) or '').upper() == 'Y'])
+    counts = [values.get(name) or 0 for name in REALTIME_COUNT_FIELDS]
+    return {'flags': flags, 'counts': counts}
+
+def flag_q(name, prefix=''):
+    """Y/N 필드가 Y -> (flags & 비트) = 비트. 비트별로 조건을 나눠야 부분 인덱스와 같은 식이 됨"""
+    bit = flag_mask(name)
+    return models.Q(Exact(F(f'{prefix}flags').bitand(bit), bit))
+
+def count_q(name, prefix=''):
+    """병상 수 필드가 1 이상 -> counts[i] > 0"""
+    return models.Q(**{f'{prefix}counts__{REALTIME_COUNT_FIELDS.index(name)}__gt': 0})
+
+def availability_q(names, prefix=''):
+    """
+    필수 장비/병상 조건 -> Q (압축 컬럼 flags / counts 기준, HospitalRealtimeStatus 의 부분 인덱스와 같은 식)
+    prefix: Hospital 에서 조회할 때는 'realtime_status__'
+    """
+    q = models.Q()
+    for name in names:
+        if name in REALTIME_FLAG_FIELDS:
+            q &= flag_q(name, prefix)
+        elif name in REALTIME_COUNT_FIELDS:
+            q &= count_q(name, prefix)
+        else:
+            raise ValueError(name)
+    return q
+
+class RealtimeStatusQuerySet(models.QuerySet):
+    def has_flags(self, *names):
+        """모든 장비/시설이 가용(Y)인 병원만 (예: has_flags('hvctayn', 'hvmriayn'))"""
+        return self.filter(availability_q(names))
+
 class HospitalRealtimeStatus(models.Model):
     hospital = models.OneToOneField(Hospital, on_delete=models.CASCADE, related_name='realtime_status')
     
@@ -129,8 +215,93 @@ class HospitalRealtimeStatus(models.Model):
     hvventiayn = models.CharField(max_length=10, blank=True, null=True)
     hvventisoayn = models.CharField(max_length=10, blank=True, null=True)
     
+    # 압축 표현: Y/N 필드는 비트마스크, 병상 수는 배열 (REALTIME_FLAG_FIELDS / REALTIME_COUNT_FIELDS 순서)
+    # 동기화 시 위 hv* 컬럼과 함께 기록. 가용 조건 필터(availability_q)와 부분 인덱스는 이 컬럼 기준
+    flags = models.BigIntegerField(default=0)
+    counts = ArrayField(models.IntegerField(), default=list, blank=True)
+
+    # hv* 값의 해시 (동기화 시 바뀐 병원만 쓰기 위함)
+    content_hash = models.CharField(max_length=32, blank=True, default='')
     last_updated = models.DateTimeField(auto_now=True)
 
+    objects = RealtimeStatusQuerySet.as_manager()
+
+    class Meta:
+        # 자주 거는 가용 조건별 부분 인덱스 (압축 컬럼 기준, availability_q 가 만드는 조건과 같아야 사용됨)
+        indexes = [
+            models.Index(fields=['hospital'], condition=count_q('hvec'), name='rt_hvec_free_idx'),
+            models.Index(fields=['hospital'], condition=count_q('hvicc'), name='rt_hvicc_free_idx'),
+            models.Index(fields=['hospital'], condition=flag_q('hvctayn'), name='rt_ct_avail_idx'),
+            models.Index(fields=['hospital'], condition=flag_q('hvmriayn'), name='rt_mri_avail_idx'),
+            models.Index(fields=['hospital'], condition=flag_q('hvangioayn'), name='rt_angio_avail_idx'),
+            models.Index(fields=['hospital'], condition=flag_q('hvecmoayn'), name='rt_ecmo_avail_idx'),
+            models.Index(fields=['hospital'], condition=flag_q('hvventiayn'), name='rt_venti_avail_idx'),
+        ]
+
+    def flag(self, name):
+        """기존 필드명으로 Y/N 조회 -> 'Y' / 'N'"""
+        return 'Y' if self.flags & flag_mask(name) else 'N'
+
+    def count(self, name):
+        i = REALTIME_COUNT_FIELDS.index(name)
+        return self.counts[i] if i < len(self.counts) else 0
+
+# 이력으로 남기는 가용 병상 수 (배열 인덱스 순서)
+BED_HISTORY_FIELDS = ['hvec', 'hvoc', 'hvgc', 'hvicc', 'hvcc', 'hvncc', 'hvccc']
+
+class HospitalBedSample(models.Model):
+    """동기화 시점마다 쌓는 원본 스냅샷. 병원당 한 줄, 값은 BED_HISTORY_FIELDS 순서의 배열"""
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='bed_samples')
+    captured_at = models.DateTimeField()
+    counts = ArrayField(models.SmallIntegerField())
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['hospital', 'captured_at']),
+            models.Index(fields=['captured_at']), # 보존기간 정리용
+        ]
+
+class HospitalBedHourly(models.Model):
+    """원본 스냅샷을 시간 단위로 미리 집계 (동기화마다 누적 갱신)"""
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='bed_hourly')
+    hour = models.DateTimeField()
+    samples = models.IntegerField(default=0)
+    sums = ArrayField(models.IntegerField())
+    mins = ArrayField(models.SmallIntegerField())
+    maxs = ArrayField(models.SmallIntegerField())
+    last = ArrayField(models.SmallIntegerField())
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hospital', 'hour'], name='unique_hospital_bed_hour')
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+        ]
+
+class HospitalBedForecast(models.Model):
+    """요일x시간(0~167)별 응급실 가용 병상(hvec) 지수가중평균. 시간이 끝날 때마다 그 시간 평균으로 한 번 갱신"""
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='bed_forecasts')
+    hour_of_week = models.SmallIntegerField() # 월요일 0시 = 0
+    level = models.FloatField(default=0)
+    samples = models.IntegerField(default=0) # 반영한 주 수
+    last_hour = models.DateTimeField(null=True, blank=True) # 마지막으로 반영한 시간 (중복 반영 방지)
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hospital', 'hour_of_week'], name='unique_hospital_forecast_hour')
+        ]
+
+class SevereMessageQuerySet(models.QuerySet):
+    def active(self, now=None):
+        """지금 유효한 메시지 (시작 시각이 지났고 종료 시각 전이거나 종료 시각 없음)"""
+        now = now or timezone.now()
+        return self.filter(
+            models.Q(start_at__isnull=True) | models.Q(start_at__lte=now),
+            models.Q(end_at__isnull=True) | models.Q(end_at__gt=now),
+        )
+
 class HospitalSevereMessage(models.Model):
     hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='severe_messages')
     message = models.TextField(blank=True, null=True) # symBlkMsg
@@ -141,8 +312,23 @@ class HospitalSevereMessage(models.Model):
     display_method = models.CharField(max_length=10, blank=True, null=True) # symOutDspMth
     start_time = models.CharField(max_length=20, blank=True, null=True) # symBlkSttDtm
     end_time = models.CharField(max_length=20, blank=True, null=True) # symBlkEndDtm
+    # start_time/end_time 원문을 파싱한 값 (유효 기간 조회용)
+    start_at = models.DateTimeField(blank=True, null=True)
+    end_at = models.DateTimeField(blank=True, null=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = SevereMessageQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # 같은 병원/코드/시작 시각은 한 메시지 (동기화 시 upsert 기준)
+            models.UniqueConstraint(fields=['hospital', 'severe_code', 'start_time'], name='unique_hospital_severe_message')
+        ]
+        indexes = [
+            models.Index(fields=['hospital', 'end_at'], name='severe_msg_hospital_end_idx'),
+        ]
 
 class SymptomSearchLog(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
@@ -211,4 +397,41 @@ class ChatSession(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Session {self.session_id} ({self.state})"
\ No newline at end of file
+        return f"Session {self.session_id} ({self.state})"
+
+class SymptomSearchHourly(models.Model):
+    """시간 x 증상 x 시도 x 격자(위경도 0.1도, 약 10km)별 검색 수 (rollup_logs 가 누적)"""
+    hour = models.DateTimeField()
+    symptom = models.CharField(max_length=100)
+    region = models.CharField(max_length=50, default='') # 검색 위치에서 가장 가까운 병원의 시도 (first_address)
+    grid_lat = models.IntegerField() # floor(위도 * 10)
+    grid_lon = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'symptom', 'region', 'grid_lat', 'grid_lon'], name='unique_symptom_hourly')
+        ]
+        indexes = [
+            models.Index(fields=['hour']),
+            models.Index(fields=['region', 'hour']),
+        ]
+
+class RequestCountHourly(models.Model):
+    """시간 x 요청 종류 x sign_kind 별 요청 수"""
+    hour = models.DateTimeField()
+    source = models.CharField(max_length=20) # symptom / location
+    sign_kind = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hour', 'source', 'sign_kind'], name='unique_request_count_hourly')
+        ]
+
+class RollupWatermark(models.Model):
+    """로그 테이블별로 집계를 마친 마지막 id"""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
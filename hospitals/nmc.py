@@ -0,0 +1,162 @@
+"""
+국립중앙의료원(NMC) 응급의료 Open API 클라이언트
+
+지역(시도) x 페이지 단위로 요청을 나눠 스레드 풀에서 동시에 가져오고,
+<item> 단위로 스트리밍 파싱한 레코드를 파싱되는 대로 흘려보낸다 (페이지 전체를 모으지 않음).
+"""
+import io
+import queue
+import random
+import time
+import logging
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+NMC_BASE_URL = "http://apis.data.go.kr/B552657/ErmctInfoInqireService"
+
+# 응급실 실시간 가용병상정보
+REALTIME_BEDS = "getEmrrmRltmUsefulSckbdInfoInqire"
+# 중증질환자 수용가능정보 (응급실 메시지)
+SEVERE_MESSAGES = "getEmrrmSrsillDissMsgInqire"
+
+# STAGE1 (시도)
+REGIONS = [
+    "서울특별시", "부산광역시", "대구광역시", "인천광역시", "광주광역시", "대전광역시",
+    "울산광역시", "세종특별자치시", "경기도", "강원특별자치도", "충청북도", "충청남도",
+    "전북특별자치도", "전라남도", "경상북도", "경상남도", "제주특별자치도",
+]
+
+
+class NMCApiError(Exception):
+    pass
+
+
+def parse_items(source, convert=None):
+    """
+    응답 XML 을 iterparse 로 훑으면서 <item> 이 닫힐 때마다 레코드 하나를 yield 하고, 끝나면 totalCount 를 반환
+    (total = yield from parse_items(...) 또는 StopIteration.value)
+    전체 문서를 중첩 dict 트리로 만들지 않고, 처리한 item 요소는 바로 비운다.
+    convert: item(dict) -> 레코드 변환 함수 (예: 모델 필드 타입으로 변환)
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    total = 0
+    items = None
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.tag == 'items':
+                items = elem
+            continue
+
+        if elem.tag == 'item':
+            item = {child.tag: child.text for child in elem}
+            if items is not None:
+                items.clear()
+            yield convert(item) if convert else item
+        elif elem.tag == 'resultCode' and elem.text != '00':
+            raise NMCApiError(f"resultCode {elem.text}")
+        elif elem.tag == 'returnAuthMsg':
+            # 인증키 오류 등은 OpenAPI_ServiceResponse 형식으로 옴
+            raise NMCApiError(elem.text)
+        elif elem.tag == 'totalCount':
+            total = int(elem.text or 0)
+    return total
+
+
+class NMCClient:
+    def __init__(self, service_key=None, workers=None, page_size=100, retries=3, timeout=10):
+        self.service_key = service_key or settings.NMC_API_KEY
+        self.workers = workers or getattr(settings, 'NMC_FETCH_WORKERS', 8)
+        self.page_size = page_size
+        self.retries = retries
+        self.timeout = timeout
+
+        # 모든 스레드가 keep-alive 커넥션 풀을 공유
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch_page(self, operation, page, convert=None, emit=None, **params):
+        """
+        한 페이지 요청 -> totalCount. 레코드는 파싱되는 대로 emit(레코드) 로 넘긴다.
+        emit 이 없으면 (레코드 리스트, totalCount) 반환.
+        레코드를 넘기기 시작한 뒤 실패하면 다시 받을 때 중복되므로 재시도하지 않고 실패 처리
+        """
+        if emit is None:
+            records = []
+            total = self.fetch_page(operation, page, convert, records.append, **params)
+            return records, total
+
+        params.update({'serviceKey': self.service_key, 'pageNo': page, 'numOfRows': self.page_size})
+        for attempt in range(self.retries + 1):
+            sent = 0
+            try:
+                # 본문을 메모리에 모으지 않고 소켓에서 바로 파싱
+                with self.session.get(f"{NMC_BASE_URL}/{operation}", params=params, timeout=self.timeout, stream=True) as response:
+                    response.raise_for_status()
+                    response.raw.decode_content = True
+                    records = parse_items(response.raw, convert)
+                    while True:
+                        try:
+                            record = next(records)
+                        except StopIteration as stop:
+                            return stop.value
+                        emit(record)
+                        sent += 1
+            except (requests.RequestException, NMCApiError, ET.ParseError) as e:
+                if attempt == self.retries or sent:
+                    raise
+                # 지수 백오프 + 지터 (동시에 실패한 요청들이 한꺼번에 재시도하지 않도록)
+                delay = (2 ** attempt) * 0.5 + random.uniform(0, 0.5)
+                logger.warning(f"NMC {operation} {params.get('STAGE1')} p{page} failed ({e}), retry in {delay:.1f}s")
+                time.sleep(delay)
+
+    def iter_items(self, operation, regions=REGIONS, convert=None, failures=None):
+        """
+        지역별 첫 페이지를 동시에 요청하고, totalCount 를 보고 나머지 페이지를 이어서 요청.
+        각 스레드가 파싱하는 대로 넘긴 레코드를 바로 yield 하므로 호출자는 페이지가 끝나기를 기다리지 않고 저장할 수 있다.
+        regions=None 이면 지역 구분 없이 전국 한 번에 (STAGE1 을 받지 않는 오퍼레이션용)
+        failures: 리스트를 넘기면 재시도 후에도 실패한 (지역, 페이지, 오류) 를 담음 (수집이 완전했는지 확인용)
+        """
+        # 스레드 -> 호출자: ('item', 레코드) 또는 페이지가 끝나면 ('done', 지역, 페이지, totalCount 또는 예외)
+        results = queue.Queue()
+
+        def fetch(region, page):
+            params = {'STAGE1': region} if region else {}
+            try:
+                outcome = self.fetch_page(operation, page, convert, lambda record: results.put(('item', record)), **params)
+            except Exception as e:
+                outcome = e
+            results.put(('done', region, page, outcome))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            running = 0
+            for region in regions or [None]:
+                executor.submit(fetch, region, 1)
+                running += 1
+            while running:
+                message = results.get()
+                if message[0] == 'item':
+                    yield message[1]
+                    continue
+
+                running -= 1
+                _, region, page, total = message
+                if isinstance(total, Exception):
+                    logger.error(f"NMC {operation} {region} p{page} skipped: {total}")
+                    if failures is not None:
+                        failures.append((region, page, total))
+                    continue
+
+                if page == 1:
+                    last_page = -(-total // self.page_size)
+                    for next_page in range(2, last_page + 1):
+                        executor.submit(fetch, region, next_page)
+                        running += 1
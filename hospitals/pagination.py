@@ -0,0 +1,16 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ReviewCursorPagination(CursorPagination):
+    # (hospital, created_at) 인덱스 범위 스캔 한 번으로 한 페이지
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class CommentCursorPagination(CursorPagination):
+    ordering = ('created_at', 'id')
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 200
@@ -0,0 +1,253 @@
+"""
+로그 테이블 월별 파티셔닝 (PostgreSQL RANGE 파티션, created_at 기준)
+
+- convert_table: 일반 테이블 -> 파티션 테이블 (기존 데이터 복사, PK 는 (id, created_at))
+  월 파티션이 없는 시각의 행은 DEFAULT 파티션으로 들어가므로 작업이 밀려도 INSERT 는 실패하지 않음
+- ensure_partitions: 이번 달부터 N개월 뒤까지 파티션 생성, DEFAULT 에 들어간 행은 제 달 파티션으로 옮김
+- archive_partitions: 보존 기간이 지난 파티션을 떼어내 gzip CSV 로 내보낸 뒤 삭제
+  (내보내기가 끝까지 성공한 경우에만 삭제, 보관 위치가 없으면 삭제하지 않음)
+"""
+import gzip
+import logging
+import os
+import re
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from accounts.models import ParamedicAuthHistory, UserLog
+from .models import SymptomSearchLog, UserLocationLog
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_MODELS = [SymptomSearchLog, UserLocationLog, UserLog, ParamedicAuthHistory]
+
+# 일반 로그와 보존 기간을 따로 두는 모델 (개월). 없으면 manage_log_partitions --retain-months
+RETENTION_MONTHS = {
+    # 구급대원 인증 이력은 감사 기록 (주민등록번호 포함)
+    ParamedicAuthHistory: getattr(settings, 'PARAMEDIC_AUTH_RETAIN_MONTHS', 36),
+}
+
+# 파티션 테이블 생성 시 함께 만드는 인덱스 (BRIN / FK 인덱스 외)
+EXTRA_INDEXES = {
+    # 추천 결과 재사용 조회 (GeneralSymptomView)
+    SymptomSearchLog: ['symptoms', 'gender', 'age', 'created_at'],
+}
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def month_start(when=None):
+    when = timezone.localtime(when or timezone.now())
+    return timezone.make_aware(datetime(when.year, when.month, 1))
+
+
+def partition_name(table, start):
+    return f"{table}_p{start:%Y%m}"
+
+
+def partition_month(table, name):
+    match = re.fullmatch(rf"{re.escape(table)}_p(\d{{4}})(\d{{2}})", name)
+    if not match:
+        return None
+    return timezone.make_aware(datetime(int(match.group(1)), int(match.group(2)), 1))
+
+
+def is_partitioned(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = %s",
+            [table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions(table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+            """,
+            [table],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def default_partition_name(table):
+    return f"{table}_default"
+
+
+def create_default_partition(cursor, table):
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS "{default_partition_name(table)}" PARTITION OF "{table}" DEFAULT')
+
+
+def create_partition(cursor, table, start):
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, start)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [start, add_months(start, 1)],
+    )
+
+
+def convert_table(model):
+    """
+    일반 테이블을 같은 이름의 파티션 테이블로 교체. 테이블 전체를 잠그므로 점검 시간에 실행.
+    Postgres 17 이전은 파티션 테이블에 IDENTITY 를 쓸 수 없어 정수 id 는 시퀀스 기본값으로 대체.
+    """
+    table = model._meta.db_table
+    if is_partitioned(table):
+        return False
+
+    pk = model._meta.pk.column
+    legacy = f"{table}_legacy"
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        cursor.execute(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            f"PARTITION BY RANGE (created_at)"
+        )
+        # 이름을 지정하지 않으면 아직 남아 있는 기존 테이블의 {table}_pkey 와 겹침
+        cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_part_pkey" PRIMARY KEY ("{pk}", created_at)')
+
+        if model._meta.pk.get_internal_type() in ('AutoField', 'BigAutoField'):
+            sequence = f"{table}_{pk}_part_seq"
+            cursor.execute(f'CREATE SEQUENCE "{sequence}" OWNED BY "{table}"."{pk}"')
+            cursor.execute(f'ALTER TABLE "{table}" ALTER COLUMN "{pk}" SET DEFAULT nextval(%s)', [sequence])
+            cursor.execute(f'SELECT setval(%s, COALESCE((SELECT MAX("{pk}") FROM "{legacy}"), 0) + 1, false)', [sequence])
+
+        # 기존 데이터가 들어갈 파티션 + 앞으로 쓸 파티션
+        cursor.execute(f'SELECT MIN(created_at) FROM "{legacy}"')
+        oldest = cursor.fetchone()[0]
+        start = month_start(oldest) if oldest else month_start()
+        while start <= month_start():
+            create_partition(cursor, table, start)
+            start = add_months(start, 1)
+
+        create_default_partition(cursor, table)
+
+        cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+        cursor.execute(f'DROP TABLE "{legacy}"')
+
+        # 인덱스/FK 는 부모에 만들면 모든 파티션에 적용됨
+        cursor.execute(f'CREATE INDEX "{table}_created_brin" ON "{table}" USING brin (created_at)')
+        for field in model._meta.concrete_fields:
+            if field.is_relation:
+                target = field.target_field
+                cursor.execute(f'CREATE INDEX "{table}_{field.column}_idx" ON "{table}" ("{field.column}")')
+                cursor.execute(
+                    f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{field.column}_fk" FOREIGN KEY ("{field.column}") '
+                    f'REFERENCES "{target.model._meta.db_table}" ("{target.column}") DEFERRABLE INITIALLY DEFERRED'
+                )
+        columns = EXTRA_INDEXES.get(model)
+        if columns:
+            cursor.execute(
+                f'CREATE INDEX "{table}_lookup_idx" ON "{table}" ({", ".join(columns)})'
+            )
+    return True
+
+
+def move_from_default(cursor, table, start):
+    """
+    DEFAULT 파티션에 들어간 start 달의 행을 새 월 파티션으로 옮김 -> 옮긴 행 수
+    DEFAULT 에 그 달 행이 남아 있으면 월 파티션을 만들 수 없으므로, 따로 만든 테이블로 옮긴 뒤 붙임
+    """
+    name = partition_name(table, start)
+    end = add_months(start, 1)
+    cursor.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM "{default_partition_name(table)}" WHERE created_at >= %s AND created_at < %s RETURNING *) '
+        f'INSERT INTO "{name}" SELECT * FROM moved',
+        [start, end],
+    )
+    moved = cursor.rowcount
+    cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', [start, end])
+    return moved
+
+
+def ensure_partitions(model, months_ahead=3):
+    """
+    이번 달부터 months_ahead 개월 뒤까지 파티션 생성 -> 만든 파티션 이름 목록
+    주기 작업이 밀려 DEFAULT 파티션에 들어간 행이 있으면 그 달의 파티션을 만들어 옮기고 경고를 남김
+    """
+    table = model._meta.db_table
+    default = default_partition_name(table)
+    created = []
+    existing = set(list_partitions(table))
+    with connection.cursor() as cursor:
+        if default not in existing:
+            create_default_partition(cursor, table)
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', created_at, %s) FROM \"{default}\"", [settings.TIME_ZONE])
+        stray = {month_start(row[0]) for row in cursor.fetchall()}
+
+        months = set(stray)
+        start = month_start()
+        for _ in range(months_ahead + 1):
+            months.add(start)
+            start = add_months(start, 1)
+
+        for start in sorted(months):
+            name = partition_name(table, start)
+            if name in existing:
+                continue
+            with transaction.atomic():
+                if start in stray:
+                    moved = move_from_default(cursor, table, start)
+                    logger.warning(f"{table}: moved {moved} rows from {default} to {name} (partition was missing)")
+                else:
+                    create_partition(cursor, table, start)
+            created.append(name)
+    return created
+
+
+def export_partition(cursor, name, path):
+    """파티션 -> gzip CSV. 소유자만 읽을 수 있게 만들고 fsync 후 이름을 바꿔 반쯤 쓴 파일이 남지 않게 함"""
+    cursor.execute(f'SELECT COUNT(*) FROM "{name}"')
+    expected = cursor.fetchone()[0]
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            with gzip.open(raw, 'wt', encoding='utf-8') as fp:
+                cursor.copy_expert(f'COPY "{name}" TO STDOUT WITH CSV HEADER', fp)
+            raw.flush()
+            os.fsync(raw.fileno())
+        if cursor.rowcount >= 0 and cursor.rowcount != expected:
+            raise RuntimeError(f"{name}: exported {cursor.rowcount} rows, expected {expected}")
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return expected
+
+
+def archive_partitions(model, retain_months=12, archive_dir=None, dry_run=False):
+    """
+    retain_months 보다 오래된 파티션 -> archive_dir/<파티션>.csv.gz 로 내보내고 삭제.
+    떼어내기/내보내기/삭제를 파티션마다 한 트랜잭션으로 묶어, 내보내기가 실패하면 파티션은 그대로 남음.
+    """
+    table = model._meta.db_table
+    cutoff = add_months(month_start(), -retain_months)
+    old = sorted(name for name in list_partitions(table) if (partition_month(table, name) or cutoff) < cutoff)
+    if dry_run or not old:
+        return old
+    if not archive_dir:
+        raise ValueError(f"{table}: archive_dir is required before dropping partitions")
+
+    os.makedirs(archive_dir, mode=0o700, exist_ok=True)
+    for name in old:
+        path = os.path.join(archive_dir, f"{name}.csv.gz")
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+            rows = export_partition(cursor, name, path)
+            cursor.execute(f'DROP TABLE "{name}"')
+        logger.info(f"Archived {name} ({rows} rows) -> {path}")
+    return old
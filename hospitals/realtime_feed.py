@@ -0,0 +1,88 @@
+"""
+실시간 병상 변경분(delta) 피드
+
+동기화 작업이 바뀐 필드의 이전/새 값을 Redis Stream 에 쌓고,
+클라이언트는 마지막으로 받은 id 이후의 변경분만 long-poll / SSE 로 받아간다.
+"""
+import json
+import logging
+import re
+import threading
+
+from django.conf import settings
+from django_redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = 'hospitals:realtime:deltas'
+# 5분 주기 x 병원 수백 곳 기준으로 수 시간 분량
+STREAM_MAXLEN = 20000
+STREAM_ID_RE = re.compile(r'\d+(-\d+)?')
+
+# long-poll / SSE 는 요청마다 워커 스레드를 붙잡으므로 프로세스당 동시 연결 수를 제한
+# (나머지 스레드는 일반 API 용으로 남김)
+stream_slots = threading.BoundedSemaphore(getattr(settings, 'REALTIME_MAX_STREAMS', 8))
+
+
+def slot_releaser():
+    """
+    stream_slots 를 한 번만 반환하는 함수.
+    시작되지 않은 제너레이터는 닫아도 finally 가 돌지 않으므로 응답 close 와 스트림 종료 양쪽에 걸고, 먼저 불린 쪽만 반환
+    """
+    once = threading.Lock()
+
+    def release():
+        if once.acquire(blocking=False):
+            stream_slots.release()
+    return release
+
+
+def valid_id(value):
+    return value == '$' or bool(STREAM_ID_RE.fullmatch(value or ''))
+
+
+def _decode(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def publish_deltas(deltas):
+    """deltas: [{"hpid", "region", "changes": {field: [old, new]}}]"""
+    if not deltas:
+        return
+    try:
+        conn = get_redis_connection('default')
+        pipe = conn.pipeline(transaction=False)
+        for delta in deltas:
+            pipe.xadd(STREAM_KEY, {
+                'hpid': delta['hpid'],
+                'region': delta['region'] or '',
+                'changes': json.dumps(delta['changes'], ensure_ascii=False),
+            }, maxlen=STREAM_MAXLEN, approximate=True)
+        pipe.execute()
+    except Exception as e:
+        # 피드 발행 실패가 동기화 자체를 실패시키지 않도록
+        logger.error(f"Realtime delta publish failed: {e}")
+
+
+def latest_id():
+    conn = get_redis_connection('default')
+    entries = conn.xrevrange(STREAM_KEY, count=1)
+    return _decode(entries[0][0]) if entries else '0-0'
+
+
+def read_deltas(last_id, block_ms=None, count=1000):
+    """last_id 이후의 변경분 -> [(entry_id, {"hpid", "region", "changes"})]"""
+    if not valid_id(last_id):
+        raise ValueError(f"invalid stream id: {last_id!r}")
+    conn = get_redis_connection('default')
+    response = conn.xread({STREAM_KEY: last_id}, count=count, block=block_ms)
+    entries = []
+    for _, stream_entries in response or []:
+        for entry_id, fields in stream_entries:
+            fields = {_decode(k): _decode(v) for k, v in fields.items()}
+            entries.append((_decode(entry_id), {
+                'hpid': fields['hpid'],
+                'region': fields['region'],
+                'changes': json.loads(fields['changes']),
+            }))
+    return entries
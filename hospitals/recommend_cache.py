@@ -0,0 +1,115 @@
+"""
+GeneralSymptomView 추천 결과 캐시
+
+같은 동네(geohash 셀)에서 같은 증상/성별/연령대로 요청하면 후보 병원과 점수가 거의 같으므로,
+셀 단위로 AI 추천 필드 + 병원별 점수/표시 정보를 캐시해 두고 요청마다 거리만 정확한 위치로 다시 계산한다.
+실시간/중증 메시지 동기화마다 세대(generation)를 올려 이전 결과는 자동으로 버려진다.
+"""
+import hashlib
+import json
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'hospitals:recommend:generation'
+CACHE_KEY = 'hospitals:recommend:{}'
+CACHE_TIMEOUT = 60 * 10
+
+# 위도 16비트 x 경도 16비트 -> 약 300m x 490m 셀 (위도 37도 기준)
+GEOHASH_BITS = 32
+# 캐시에 넣을 후보는 반경보다 이만큼 넓게 잡아 같은 셀의 다른 위치에서도 빠지는 병원이 없도록
+CELL_MARGIN_KM = 1.0
+EARTH_RADIUS_KM = 6371.0088
+
+
+def enabled():
+    return getattr(settings, 'RECOMMEND_CACHE_ENABLED', True)
+
+
+def geohash(lat, lon, bits=GEOHASH_BITS):
+    """표준 geohash 와 같은 방식(경도/위도 비트 교차)으로 bits 비트까지 나눈 셀 -> 16진수 문자열"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    code = 0
+    for i in range(bits):
+        bounds, value = (lon_range, lon) if i % 2 == 0 else (lat_range, lat)
+        mid = (bounds[0] + bounds[1]) / 2
+        code <<= 1
+        if value >= mid:
+            code |= 1
+            bounds[0] = mid
+        else:
+            bounds[1] = mid
+    return format(code, f'0{(bits + 3) // 4}x')
+
+
+def age_band(age):
+    """'34' / '30대' -> '30', 숫자가 없으면 그대로"""
+    if age is None:
+        return ''
+    text = str(age).strip()
+    digits = ''.join(ch for ch in text if ch.isdigit())
+    return str(int(digits) // 10 * 10) if digits else text
+
+
+def normalize_symptoms(symptoms):
+    return sorted({str(s).strip().lower() for s in symptoms if s and str(s).strip()})
+
+
+def generation():
+    return cache.get_or_set(GENERATION_KEY, time.time_ns, None)
+
+
+def invalidate():
+    cache.set(GENERATION_KEY, time.time_ns(), None)
+
+
+def make_key(symptoms, gender, age, lat, lon, required=(), use_forecast=False):
+    parts = [
+        normalize_symptoms(symptoms), gender or '', age_band(age), geohash(lat, lon),
+        sorted(required), bool(use_forecast), generation(),
+    ]
+    return CACHE_KEY.format(hashlib.md5(json.dumps(parts, ensure_ascii=False).encode()).hexdigest())
+
+
+def get(key):
+    return cache.get(key)
+
+
+def store(key, recommended_fields, openai_comment, hospitals, points=None):
+    """
+    hospitals: 점수 계산이 끝난 병원 dict 목록 (distance 는 요청마다 다시 계산하므로 빼고 저장)
+    points: hpid -> (위도, 경도). DB 경로에서 거리를 잰 location 좌표 (latitude/longitude 컬럼은 비어 있을 수 있음)
+    """
+    points = points or {}
+    cache.set(key, {
+        "fields": recommended_fields,
+        "comment": openai_comment,
+        "hospitals": [
+            dict({k: v for k, v in h.items() if k != 'distance'}, _point=points.get(h['hpid']))
+            for h in hospitals
+        ],
+    }, CACHE_TIMEOUT)
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def with_distance(hospitals, lat, lon):
+    """
+    캐시된 병원 목록에 현재 위치 기준 거리를 붙여 가까운 순으로.
+    저장할 때의 location 좌표를 우선 쓰고, 좌표를 알 수 없는 병원은 뺀다 (DB 경로에서도 location 이 없으면 후보가 아님)
+    """
+    located = []
+    for h in hospitals:
+        point_lat, point_lon = h.get('_point') or (h.get('latitude'), h.get('longitude'))
+        if point_lat is None or point_lon is None:
+            continue
+        hospital = {k: v for k, v in h.items() if k != '_point'}
+        hospital['distance'] = round(distance_km(lat, lon, point_lat, point_lon), 2)
+        located.append(hospital)
+    return sorted(located, key=lambda h: h['distance'])
@@ -0,0 +1,43 @@
+"""
+Hospital 리뷰 집계 (review_count / rating_sum / rating_1~5) 갱신
+
+읽을 때마다 reviews 를 조인해 Avg/Count 하지 않도록, 리뷰가 바뀔 때 차이만큼 UPDATE ... SET x = x + n 으로 반영한다.
+"""
+from collections import Counter
+
+from django.db.models import Count, F, Q, Sum
+
+from .models import Hospital, Review
+
+RATINGS = range(1, 6)
+STAT_FIELDS = ['review_count', 'rating_sum'] + [f'rating_{score}' for score in RATINGS]
+
+
+def apply_review_change(hpid, old_rating=None, new_rating=None):
+    """작성: new_rating 만 / 삭제: old_rating 만 / 수정: 둘 다"""
+    delta = Counter()
+    if old_rating is not None:
+        delta['review_count'] -= 1
+        delta['rating_sum'] -= old_rating
+        if old_rating in RATINGS:
+            delta[f'rating_{old_rating}'] -= 1
+    if new_rating is not None:
+        delta['review_count'] += 1
+        delta['rating_sum'] += new_rating
+        if new_rating in RATINGS:
+            delta[f'rating_{new_rating}'] += 1
+
+    updates = {field: F(field) + n for field, n in delta.items() if n}
+    if updates:
+        Hospital.objects.filter(hpid=hpid).update(**updates)
+
+
+def compute_review_stats():
+    """reviews 테이블에서 병원별 집계를 GROUP BY 한 번으로 -> {hpid: {필드: 값}}"""
+    rows = Review.objects.values('hospital_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{f'rating_{score}': Count('id', filter=Q(rating=score)) for score in RATINGS},
+    )
+    return {row.pop('hospital_id'): row for row in rows}
+
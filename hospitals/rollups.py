@@ -0,0 +1,125 @@
+"""
+검색/위치 로그 시간 단위 집계 (대시보드용)
+
+- SymptomSearchHourly: 시간 x 증상 x 시도 x 격자(위경도 0.1도) 별 검색 수
+  시도 경계 데이터가 없으므로 검색 위치에서 가장 가까운 병원의 시도(first_address)로 정함 (GiST KNN)
+- RequestCountHourly: 시간 x 요청 종류(symptom / location) x sign_kind 별 요청 수
+
+로그 테이블마다 RollupWatermark.last_id 이후 행만 읽어 집계 테이블에 더하고,
+집계와 워터마크 갱신을 한 트랜잭션으로 묶어 같은 행이 두 번 더해지지 않게 한다.
+로그는 백그라운드에서 일괄 저장되므로 (accounts.log_writer) SETTLE_SECONDS 이전 행까지만 처리.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .list_cache import OTHER_REGION
+from .models import (
+    Hospital, RequestCountHourly, RollupWatermark, SymptomSearchHourly, SymptomSearchLog, UserLocationLog,
+)
+
+logger = logging.getLogger(__name__)
+
+GRID_SCALE = 10 # 위경도 * 10 -> 약 10km 격자
+SETTLE_SECONDS = 60
+BATCH_ROWS = 200000 # 한 번에 처리할 최대 로그 행 수 (밀린 경우 여러 번에 나눠 처리)
+
+REQUEST_SOURCES = {
+    'symptom': SymptomSearchLog,
+    'location': UserLocationLog,
+}
+
+
+def _id_range(cursor, table, last_id, cutoff):
+    cursor.execute(
+        f'SELECT MAX(id) FROM (SELECT id FROM "{table}" WHERE id > %s AND created_at < %s ORDER BY id LIMIT %s) t',
+        [last_id, cutoff, BATCH_ROWS],
+    )
+    return cursor.fetchone()[0]
+
+
+def _rollup_symptoms(cursor, table, low, high):
+    symptom_length = SymptomSearchHourly._meta.get_field('symptom').max_length
+    cursor.execute(
+        f"""
+        INSERT INTO "{SymptomSearchHourly._meta.db_table}" (hour, symptom, region, grid_lat, grid_lon, count)
+        SELECT date_trunc('hour', log.created_at), left(btrim(token), {symptom_length}),
+               COALESCE(NULLIF(near.first_address, ''), %s),
+               floor(log.latitude * {GRID_SCALE})::int, floor(log.longitude * {GRID_SCALE})::int, COUNT(*)
+        FROM "{table}" log
+        LEFT JOIN LATERAL (
+            SELECT h.first_address FROM "{Hospital._meta.db_table}" h
+            WHERE h.location IS NOT NULL
+            ORDER BY h.location <-> ST_SetSRID(ST_MakePoint(log.longitude, log.latitude), 4326)::geography
+            LIMIT 1
+        ) near ON true
+        CROSS JOIN LATERAL unnest(string_to_array(log.symptoms, ',')) AS token
+        WHERE log.id > %s AND log.id <= %s AND btrim(token) <> ''
+        GROUP BY 1, 2, 3, 4, 5
+        ON CONFLICT (hour, symptom, region, grid_lat, grid_lon)
+        DO UPDATE SET count = "{SymptomSearchHourly._meta.db_table}".count + EXCLUDED.count
+        """,
+        [OTHER_REGION, low, high],
+    )
+
+
+def _rollup_requests(cursor, table, source, low, high):
+    cursor.execute(
+        f"""
+        INSERT INTO "{RequestCountHourly._meta.db_table}" (hour, source, sign_kind, count)
+        SELECT date_trunc('hour', created_at), %s, sign_kind, COUNT(*)
+        FROM "{table}"
+        WHERE id > %s AND id <= %s
+        GROUP BY 1, 3
+        ON CONFLICT (hour, source, sign_kind)
+        DO UPDATE SET count = "{RequestCountHourly._meta.db_table}".count + EXCLUDED.count
+        """,
+        [source, low, high],
+    )
+
+
+def rollup(now=None):
+    """새로 쌓인 로그를 집계 -> {source: 처리한 마지막 id (없으면 None)}"""
+    cutoff = (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+    processed = {}
+    for source, model in REQUEST_SOURCES.items():
+        table = model._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=table)
+            high = _id_range(cursor, table, mark.last_id, cutoff)
+            processed[source] = high
+            if high is None:
+                continue
+
+            if model is SymptomSearchLog:
+                _rollup_symptoms(cursor, table, mark.last_id, high)
+            _rollup_requests(cursor, table, source, mark.last_id, high)
+
+            mark.last_id = high
+            mark.save(update_fields=['last_id', 'updated_at'])
+        logger.info(f"Rolled up {table} up to id {high}")
+    return processed
+
+
+def top_symptoms(since, until=None, region=None, limit=20):
+    rows = SymptomSearchHourly.objects.filter(hour__gte=since)
+    if until:
+        rows = rows.filter(hour__lt=until)
+    if region:
+        rows = rows.filter(region=region)
+    return list(
+        rows.values('symptom').annotate(count=Sum('count')).order_by('-count', 'symptom')[:limit]
+    )
+
+
+def request_counts(since, until=None, source=None):
+    """시간별 sign_kind 별 요청 수 -> [{hour, source, sign_kind, count}]"""
+    rows = RequestCountHourly.objects.filter(hour__gte=since)
+    if until:
+        rows = rows.filter(hour__lt=until)
+    if source:
+        rows = rows.filter(source=source)
+    return list(rows.order_by('hour', 'source', 'sign_kind').values('hour', 'source', 'sign_kind', 'count'))
@@ -0,0 +1,228 @@
+"""
+NMC 실시간 데이터 -> DB 동기화
+
+NMCClient.iter_items() 가 흘려보내는 레코드를 batch_size 단위로 모아 바로 저장한다.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from itertools import islice
+
+from django.db import models
+from django.utils import timezone
+
+from .models import Hospital, HospitalRealtimeStatus, HospitalSevereMessage, UpdateLog, encode_compact
+from .nmc import REALTIME_BEDS, SEVERE_MESSAGES
+from .realtime_feed import publish_deltas
+from .history import record_snapshot
+from .forecast import update_forecast
+from . import list_cache
+from . import recommend_cache
+
+logger = logging.getLogger(__name__)
+
+# 응답 XML 필드명과 모델 필드명이 같음 (hv*)
+REALTIME_FIELDS = [f for f in HospitalRealtimeStatus._meta.concrete_fields if f.name.startswith('hv')]
+# 입력 시각(hvidate)은 병상 수가 그대로여도 보고마다 바뀌므로 변경 여부 판단에서 제외
+IGNORED_CHANGE_FIELDS = {'hvidate'}
+
+
+def to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_realtime_item(item):
+    """item(dict) -> (hpid, HospitalRealtimeStatus 필드 값). 파서가 <item> 마다 바로 호출"""
+    values = {}
+    for field in REALTIME_FIELDS:
+        raw = item.get(field.name)
+        if isinstance(field, models.IntegerField):
+            values[field.name] = to_int(raw)
+        else:
+            values[field.name] = str(raw)[:field.max_length] if raw is not None else None
+    return item.get('hpid'), values
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def content_hash(values):
+    values = {name: value for name, value in values.items() if name not in IGNORED_CHANGE_FIELDS}
+    return hashlib.md5(json.dumps(values, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class RealtimeStatusWriter:
+    """
+    병원별 내용 해시를 비교해 바뀐 행만 모아 INSERT ... ON CONFLICT DO UPDATE 한 번으로 반영.
+    바뀌지 않은 병원은 last_updated 도 그대로 둔다 (입력 시각 hvidate 만 바뀐 경우도 바뀌지 않은 것으로 봄).
+    반영 직전에 바뀐 병원의 이전 값을 읽어 필드별 [이전, 새] 값을 deltas 에 모은다.
+    """
+
+    def __init__(self, flush_size=500):
+        # FK 대상이 되는 병원 목록과 직전 동기화 시점의 해시 (한 번만 조회)
+        # hpid -> 시도 (변경분 피드의 지역 필터용)
+        self.known_hpids = dict(Hospital.objects.values_list('hpid', 'first_address'))
+        self.hashes = dict(HospitalRealtimeStatus.objects.values_list('hospital_id', 'content_hash'))
+        self.flush_size = flush_size
+        self.pending = {}
+        self.written = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.deltas = []
+        self.changed_regions = set()
+
+    def write(self, records):
+        for hpid, values in records:
+            if hpid not in self.known_hpids:
+                self.skipped += 1
+                continue
+            digest = content_hash(values)
+            self.written += 1
+            if self.hashes.get(hpid) == digest:
+                self.unchanged += 1
+                continue
+            self.hashes[hpid] = digest
+            self.pending[hpid] = HospitalRealtimeStatus(hospital_id=hpid, content_hash=digest, **values, **encode_compact(values))
+
+        if len(self.pending) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        rows = list(self.pending.values())
+        self.collect_deltas(rows)
+        self.changed_regions.update(self.known_hpids[row.hospital_id] for row in rows)
+        # last_updated(auto_now)는 INSERT 시 pre_save 로 채워지고, 충돌 시 EXCLUDED 값으로 갱신됨
+        HospitalRealtimeStatus.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['hospital'],
+            update_fields=[f.name for f in REALTIME_FIELDS] + ['flags', 'counts', 'content_hash', 'last_updated'],
+        )
+        self.changed += len(rows)
+        self.pending = {}
+
+    def collect_deltas(self, rows):
+        names = [f.name for f in REALTIME_FIELDS]
+        previous = {
+            row['hospital_id']: row
+            for row in HospitalRealtimeStatus.objects.filter(hospital_id__in=self.pending).values('hospital_id', *names)
+        }
+        for row in rows:
+            old = previous.get(row.hospital_id, {})
+            changes = {
+                name: [old.get(name), getattr(row, name)]
+                for name in names
+                if old.get(name) != getattr(row, name)
+            }
+            # 입력 시각(hvidate)만 바뀐 경우는 변경분으로 보지 않음
+            if changes.keys() - IGNORED_CHANGE_FIELDS:
+                self.deltas.append({
+                    'hpid': row.hospital_id,
+                    'region': self.known_hpids[row.hospital_id],
+                    'changes': changes,
+                })
+
+
+def sync_realtime_status(client, batch_size=100):
+    writer = RealtimeStatusWriter()
+    for batch in batched(client.iter_items(REALTIME_BEDS, convert=parse_realtime_item), batch_size):
+        writer.write(batch)
+    writer.flush()
+
+    publish_deltas(writer.deltas)
+    # 바뀐 병원이 있는 시도의 목록 캐시만 다시 만들도록
+    list_cache.invalidate(writer.changed_regions)
+    # 바뀌지 않은 병원도 이력에는 매 주기 한 점씩 남김
+    record_snapshot()
+    update_forecast()
+    # 병상/예측이 바뀌었으므로 추천 결과 캐시는 매 주기 새로
+    recommend_cache.invalidate()
+    UpdateLog.objects.update_or_create(update_key='realtime')
+    return writer
+
+
+# 응답 XML 필드명 -> HospitalSevereMessage 필드명
+SEVERE_MESSAGE_FIELDS = {
+    'symBlkMsg': 'message',
+    'symBlkMsgTyp': 'message_type',
+    'symTypCod': 'severe_code',
+    'symTypCodMag': 'severe_name',
+    'symOutDspYon': 'display_yn',
+    'symOutDspMth': 'display_method',
+    'symBlkSttDtm': 'start_time',
+    'symBlkEndDtm': 'end_time',
+}
+DATETIME_FORMATS = ['%Y%m%d%H%M%S', '%Y%m%d%H%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M']
+
+
+def parse_datetime(value):
+    if not value:
+        return None
+    for fmt in DATETIME_FORMATS:
+        try:
+            return timezone.make_aware(datetime.strptime(value.strip(), fmt))
+        except ValueError:
+            continue
+    return None
+
+
+def parse_severe_item(item):
+    values = {}
+    for source, name in SEVERE_MESSAGE_FIELDS.items():
+        raw = item.get(source)
+        max_length = HospitalSevereMessage._meta.get_field(name).max_length
+        values[name] = str(raw)[:max_length] if raw is not None and max_length else raw
+    # upsert 키 컬럼이 NULL 이면 Postgres 는 서로 다른 값으로 보므로 매번 새 행이 생김
+    values['severe_code'] = values['severe_code'] or ''
+    values['start_time'] = values['start_time'] or ''
+    values['start_at'] = parse_datetime(values['start_time'])
+    values['end_at'] = parse_datetime(values['end_time'])
+    return item.get('hpid'), values
+
+
+def sync_severe_messages(client, batch_size=500):
+    """
+    (병원, 코드, 시작 시각) 기준 upsert. 이번 수집에서 빠진 유효 메시지는 지금 시각으로 종료 처리.
+    실패한 페이지가 있으면 빠진 메시지가 실제로 끝난 것인지 알 수 없으므로 종료 처리는 건너뜀.
+    -> (반영 수, 종료 처리 수)
+    """
+    started = timezone.now()
+    failures = []
+    known_hpids = set(Hospital.objects.values_list('hpid', flat=True))
+    update_fields = [name for name in SEVERE_MESSAGE_FIELDS.values() if name not in ('severe_code', 'start_time')]
+    written = 0
+
+    for batch in batched(client.iter_items(SEVERE_MESSAGES, regions=None, convert=parse_severe_item, failures=failures), batch_size):
+        # 한 INSERT 안에 같은 키가 두 번 있으면 ON CONFLICT 가 실패하므로 배치 안에서 먼저 중복 제거
+        rows = {}
+        for hpid, values in batch:
+            if hpid in known_hpids:
+                rows[(hpid, values['severe_code'], values['start_time'])] = HospitalSevereMessage(hospital_id=hpid, **values)
+        HospitalSevereMessage.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=['hospital', 'severe_code', 'start_time'],
+            update_fields=update_fields + ['start_at', 'end_at', 'updated_at'],
+        )
+        written += len(rows)
+
+    closed = 0
+    if failures:
+        logger.warning(f"Severe messages: {len(failures)} pages failed, skipping close of missing messages")
+    # 수집이 통째로 또는 일부 실패한 경우 빠진 메시지가 종료 처리되지 않도록
+    elif written:
+        closed = HospitalSevereMessage.objects.active(started).filter(updated_at__lt=started).update(end_at=started)
+
+    recommend_cache.invalidate()
+    UpdateLog.objects.update_or_create(update_key='severe')
+    return written, closed
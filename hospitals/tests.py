@@ -0,0 +1,711 @@
+import io
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from unittest.mock import patch, MagicMock
+
+from .nmc import NMCClient, NMCApiError, REALTIME_BEDS, parse_items
+from .sync import RealtimeStatusWriter, parse_realtime_item, parse_severe_item
+from .history import summarize
+from .forecast import hour_of_week, predict_hvec
+from .models import REALTIME_COUNT_FIELDS, Hospital, HospitalRealtimeStatus, availability_q, encode_compact
+from .management.commands.load_hospitals_json import iter_json_array
+from . import list_cache
+from .list_cache import overlay_bookmarks
+from .review_stats import apply_review_change
+from . import bookmarks
+from .partitions import add_months, partition_month, partition_name
+from . import rollups
+from . import recommend_cache
+
+
+def nmc_xml(items, total):
+    body = "".join(f"<item><hpid>{hpid}</hpid><hvec>{hvec}</hvec></item>" for hpid, hvec in items)
+    return (
+        "<response><header><resultCode>00</resultCode><resultMsg>NORMAL SERVICE.</resultMsg></header>"
+        f"<body><items>{body}</items><numOfRows>2</numOfRows><pageNo>1</pageNo><totalCount>{total}</totalCount></body>"
+        "</response>"
+    ).encode()
+
+
+def mock_response(content):
+    response = MagicMock()
+    response.__enter__.return_value = response
+    response.raw = io.BytesIO(content)
+    return response
+
+
+class ParseItemsTest(SimpleTestCase):
+    def test_converts_each_item(self):
+        parsed = parse_items(nmc_xml([("A1", 3), ("A2", "")], 2), convert=parse_realtime_item)
+        # 문서 전체를 읽기 전에 첫 레코드가 나옴
+        first = next(parsed)
+        records = [first]
+        try:
+            while True:
+                records.append(next(parsed))
+        except StopIteration as stop:
+            total = stop.value
+
+        self.assertEqual(total, 2)
+        self.assertEqual([hpid for hpid, _ in records], ["A1", "A2"])
+        self.assertEqual(records[0][1]['hvec'], 3)
+        self.assertEqual(records[1][1]['hvec'], 0)
+        self.assertIsNone(records[0][1]['hvctayn'])
+
+    def test_error_result_code(self):
+        content = b"<response><header><resultCode>22</resultCode></header><body/></response>"
+        with self.assertRaises(NMCApiError):
+            list(parse_items(content))
+
+
+@override_settings(NMC_API_KEY='dummy_key')
+class NMCClientTest(SimpleTestCase):
+    def test_iter_items_follows_pages_per_region(self):
+        pages = {
+            ("서울특별시", 1): nmc_xml([("A1", 3), ("A2", 0)], 3),
+            ("서울특별시", 2): nmc_xml([("A3", 1)], 3),
+            ("부산광역시", 1): nmc_xml([("B1", 5)], 1),
+        }
+
+        def fake_get(url, params=None, timeout=None, stream=False):
+            return mock_response(pages[(params['STAGE1'], params['pageNo'])])
+
+        client = NMCClient(workers=2, page_size=2)
+        with patch.object(client.session, 'get', side_effect=fake_get):
+            items = list(client.iter_items(REALTIME_BEDS, regions=["서울특별시", "부산광역시"]))
+
+        self.assertEqual(sorted(item['hpid'] for item in items), ["A1", "A2", "A3", "B1"])
+
+    @patch('hospitals.nmc.time.sleep')
+    def test_fetch_page_retries_then_succeeds(self, mock_sleep):
+        import requests
+
+        ok = mock_response(nmc_xml([("A1", 3)], 1))
+        client = NMCClient(workers=1, retries=2)
+        with patch.object(client.session, 'get', side_effect=[requests.ConnectionError("reset"), ok]):
+            items, total = client.fetch_page(REALTIME_BEDS, 1, STAGE1="서울특별시")
+
+        self.assertEqual(total, 1)
+        self.assertEqual(items[0]['hvec'], "3")
+        self.assertEqual(mock_sleep.call_count, 1)
+
+    @patch('hospitals.nmc.time.sleep')
+    def test_page_failing_after_records_is_not_retried(self, mock_sleep):
+        truncated = nmc_xml([("A1", 3), ("A2", 0)], 2)[:-40]  # 레코드 뒤에서 끊긴 응답
+        client = NMCClient(workers=1, retries=2)
+        failures = []
+        with patch.object(client.session, 'get', side_effect=[mock_response(truncated)]) as mock_get:
+            items = list(client.iter_items(REALTIME_BEDS, regions=["서울특별시"], failures=failures))
+
+        # 이미 흘려보낸 레코드는 그대로, 같은 페이지를 다시 받지 않고 실패로 남김
+        self.assertEqual([item['hpid'] for item in items], ["A1", "A2"])
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual([(region, page) for region, page, _ in failures], [("서울특별시", 1)])
+
+
+class RealtimeStatusWriterTest(TestCase):
+    def setUp(self):
+        Hospital.objects.create(hpid="A1", name="병원1", first_address="서울특별시")
+        Hospital.objects.create(hpid="A2", name="병원2", first_address="부산광역시")
+        writer = RealtimeStatusWriter()
+        writer.write([parse_realtime_item({'hpid': "A1", 'hvec': "3"}), parse_realtime_item({'hpid': "A2", 'hvec': "5"})])
+        writer.flush()
+
+    def test_unchanged_rows_are_skipped(self):
+        before = HospitalRealtimeStatus.objects.get(hospital_id="A1").last_updated
+
+        writer = RealtimeStatusWriter()
+        with patch.object(writer, 'collect_deltas', wraps=writer.collect_deltas) as collect:
+            # 입력 시각만 바뀐 재보고도 건너뜀
+            writer.write([parse_realtime_item({'hpid': "A1", 'hvec': "3", 'hvidate': "20250101093000"})])
+            writer.flush()
+
+        self.assertEqual((writer.written, writer.unchanged, writer.changed), (1, 1, 0))
+        collect.assert_not_called()
+        self.assertEqual(writer.deltas, [])
+        self.assertEqual(HospitalRealtimeStatus.objects.get(hospital_id="A1").last_updated, before)
+
+    def test_changed_rows_are_upserted_with_deltas(self):
+        writer = RealtimeStatusWriter()
+        with patch.object(writer, 'collect_deltas', wraps=writer.collect_deltas) as collect:
+            writer.write([
+                parse_realtime_item({'hpid': "A1", 'hvec': "3"}),
+                parse_realtime_item({'hpid': "A2", 'hvec': "1"}),
+                parse_realtime_item({'hpid': "ZZ", 'hvec': "9"}),
+            ])
+            writer.flush()
+
+        self.assertEqual((writer.unchanged, writer.changed, writer.skipped), (1, 1, 1))
+        self.assertEqual([row.hospital_id for row in collect.call_args.args[0]], ["A2"])
+        self.assertEqual(writer.deltas, [{'hpid': "A2", 'region': "부산광역시", 'changes': {'hvec': [5, 1]}}])
+        self.assertEqual(writer.changed_regions, {"부산광역시"})
+
+        status = HospitalRealtimeStatus.objects.get(hospital_id="A2")
+        self.assertEqual(status.hvec, 1)
+        self.assertEqual(status.counts[REALTIME_COUNT_FIELDS.index('hvec')], 1)
+
+
+class RealtimeDeltaViewTest(SimpleTestCase):
+    @patch('hospitals.views.realtime_feed.read_deltas')
+    def test_long_poll_filters_by_region_and_advances_cursor(self, mock_read):
+        from rest_framework.test import APIRequestFactory
+        from .views import RealtimeDeltaView
+
+        mock_read.return_value = [
+            ("1-0", {"hpid": "A1", "region": "서울특별시", "changes": {"hvec": [3, 1]}}),
+            ("2-0", {"hpid": "B1", "region": "부산광역시", "changes": {"hvec": [0, 2]}}),
+        ]
+        request = APIRequestFactory().get('/hospitals/realtime/changes/', {'last_id': '0-0', 'region': '서울특별시'})
+        response = RealtimeDeltaView.as_view()(request)
+
+        self.assertEqual(response.data['last_id'], "2-0")
+        self.assertEqual([c['hpid'] for c in response.data['changes']], ["A1"])
+        self.assertEqual(response.data['changes'][0]['id'], "1-0")
+
+    @patch('hospitals.views.realtime_feed.read_deltas')
+    def test_rejects_malformed_id_and_sse_when_full(self, mock_read):
+        from rest_framework.test import APIRequestFactory
+        from .views import RealtimeDeltaView
+
+        factory = APIRequestFactory()
+        response = RealtimeDeltaView.as_view()(factory.get('/hospitals/realtime/changes/', {'last_id': '1-x'}))
+        self.assertEqual(response.status_code, 400)
+        mock_read.assert_not_called()
+
+        with patch('hospitals.views.realtime_feed.stream_slots') as mock_slots:
+            mock_slots.acquire.return_value = False
+            response = RealtimeDeltaView.as_view()(
+                factory.get('/hospitals/realtime/changes/', {'last_id': '1-0'}, HTTP_ACCEPT='text/event-stream')
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], "5")
+
+    @patch('hospitals.views.realtime_feed.read_deltas', return_value=[])
+    def test_sse_slot_released_once_even_if_stream_never_started(self, mock_read):
+        import threading
+        from rest_framework.test import APIRequestFactory
+        from .views import RealtimeDeltaView
+
+        slots = threading.BoundedSemaphore(1)
+        request = APIRequestFactory().get('/hospitals/realtime/changes/', {'last_id': '1-0'}, HTTP_ACCEPT='text/event-stream')
+        with patch('hospitals.realtime_feed.stream_slots', slots):
+            # 한 번도 읽지 않고 닫음 (HEAD, 첫 청크 전 연결 끊김)
+            response = RealtimeDeltaView.as_view()(request)
+            self.assertFalse(slots.acquire(blocking=False))
+            response.close()
+            self.assertTrue(slots.acquire(blocking=False))
+            slots.release()
+
+            # 끝까지 읽은 뒤 close 까지 불려도 한 번만 반환 (두 번이면 BoundedSemaphore 가 ValueError)
+            response = RealtimeDeltaView.as_view()(request)
+            with patch.object(RealtimeDeltaView, 'SSE_MAX_SECONDS', 0):
+                list(response.streaming_content)
+            response.close()
+            self.assertTrue(slots.acquire(blocking=False))
+
+
+class BedHistoryTest(SimpleTestCase):
+    def test_summarize_hourly_bucket(self):
+        from datetime import datetime
+        bucket = {
+            'hour': datetime(2025, 1, 1, 9),
+            'samples': 4,
+            'sums': [10, 0, 0, 6, 0, 0, 0],
+            'mins': [1, 0, 0, 1, 0, 0, 0],
+            'maxs': [4, 0, 0, 2, 0, 0, 0],
+            'last': [2, 0, 0, 1, 0, 0, 0],
+        }
+        point = summarize(bucket, ['hvec', 'hvicc'])
+
+        self.assertEqual(point['hour'], "2025-01-01T09:00:00")
+        self.assertEqual(point['hvec'], {"avg": 2.5, "min": 1, "max": 4, "last": 2})
+        self.assertEqual(point['hvicc']['avg'], 1.5)
+        self.assertNotIn('hvoc', point)
+
+
+class BedForecastTest(SimpleTestCase):
+    @patch('hospitals.forecast.HospitalBedForecast.objects')
+    def test_predict_shifts_current_value_by_seasonal_change(self, mock_objects):
+        from datetime import datetime, timezone as dt_timezone
+        now = datetime(2025, 1, 6, 8, 50, tzinfo=dt_timezone.utc)
+        now_how = hour_of_week(now)
+        # 40km -> 60분 뒤 도착 (다음 시간대)
+        mock_objects.filter.return_value.values_list.return_value = [
+            ("A1", now_how, 6.0), ("A1", now_how + 1, 2.5),
+            ("B1", now_how, 3.0),
+        ]
+
+        predictions = predict_hvec([("A1", 5, 40), ("B1", 4, 40), ("C1", -2, 1)], now=now)
+
+        self.assertEqual(predictions["A1"], 2)  # 5 + (2.5 - 6.0) = 1.5 -> 2
+        self.assertEqual(predictions["B1"], 4)  # 도착 시간대 이력 없음 -> 현재 값
+        self.assertEqual(predictions["C1"], 0)
+
+
+class BedForecastUpdateTest(TestCase):
+    def test_each_finished_hour_is_applied_once(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .forecast import update_forecast
+        from .models import HospitalBedForecast, HospitalBedHourly
+
+        hospital = Hospital.objects.create(hpid="A1", name="병원")
+        now = timezone.now().replace(minute=30, second=0, microsecond=0)
+        previous = now.replace(minute=0) - timedelta(hours=1)
+        for hour, hvec_sum in ((previous, 8), (now.replace(minute=0), 100)):
+            counts = [hvec_sum, 0, 0, 0, 0, 0, 0]
+            HospitalBedHourly.objects.create(hospital=hospital, hour=hour, samples=4, sums=counts, mins=counts, maxs=counts, last=counts)
+
+        # 5분 주기로 여러 번 불려도 끝난 시간만, 한 번만 반영
+        update_forecast(now)
+        update_forecast(now + timedelta(minutes=5))
+
+        forecast = HospitalBedForecast.objects.get()
+        self.assertEqual(forecast.hour_of_week, hour_of_week(previous))
+        self.assertEqual((forecast.samples, forecast.level), (1, 2.0))
+
+
+class SevereMessageParseTest(SimpleTestCase):
+    def test_parses_time_window(self):
+        hpid, values = parse_severe_item({
+            'hpid': 'A1', 'symBlkMsg': '소아 수용 불가', 'symTypCod': 'Y0010',
+            'symBlkSttDtm': '20250101090000', 'symBlkEndDtm': '2025-01-01 18:00:00',
+        })
+
+        self.assertEqual(hpid, 'A1')
+        self.assertEqual(values['severe_code'], 'Y0010')
+        self.assertEqual(values['start_time'], '20250101090000')
+        self.assertEqual((values['start_at'].hour, values['end_at'].hour), (9, 18))
+        self.assertIsNone(values['display_yn'])
+
+    def test_missing_key_columns_become_empty(self):
+        _, values = parse_severe_item({'hpid': 'A1', 'symBlkMsg': '수술 불가'})
+
+        self.assertEqual((values['severe_code'], values['start_time']), ('', ''))
+        self.assertIsNone(values['start_at'])
+
+    @patch('hospitals.sync.UpdateLog.objects')
+    @patch('hospitals.sync.HospitalSevereMessage.objects')
+    @patch('hospitals.sync.Hospital.objects')
+    def test_partial_pull_does_not_close_messages(self, mock_hospitals, mock_messages, mock_update_log):
+        from .sync import sync_severe_messages
+
+        mock_hospitals.values_list.return_value = ["A1"]
+        client = MagicMock()
+
+        def iter_items(operation, regions=None, convert=None, failures=None):
+            failures.append((None, 2, Exception("timeout")))
+            yield convert({'hpid': 'A1', 'symTypCod': 'Y0010', 'symBlkSttDtm': '20250101090000'})
+
+        client.iter_items.side_effect = iter_items
+        self.assertEqual(sync_severe_messages(client), (1, 0))
+        mock_messages.active.assert_not_called()
+
+
+class CompactStatusTest(SimpleTestCase):
+    def test_flags_and_counts_keep_field_names(self):
+        values = {'hvctayn': 'Y', 'hvmriayn': 'y', 'hvecmoayn': 'N', 'hvangioayn': None, 'hvec': 7, 'hvicc': 2}
+        status = HospitalRealtimeStatus(**encode_compact(values))
+
+        self.assertEqual(status.flag('hvctayn'), 'Y')
+        self.assertEqual(status.flag('hvmriayn'), 'Y')
+        self.assertEqual(status.flag('hvecmoayn'), 'N')
+        self.assertEqual(status.flag('hvangioayn'), 'N')
+        self.assertEqual(status.count('hvec'), 7)
+        self.assertEqual(status.count('hvicc'), 2)
+        self.assertEqual(status.count('hvoc'), 0)
+
+    def test_has_flags_filters_with_bitmask(self):
+        from .models import flag_mask
+        sql = str(HospitalRealtimeStatus.objects.has_flags('hvctayn', 'hvmriayn').query)
+
+        # 필드마다 (flags & 비트) = 비트 조건 (부분 인덱스와 같은 식)
+        for name in ('hvctayn', 'hvmriayn'):
+            bit = flag_mask(name)
+            self.assertRegex(sql, rf'"flags" & {bit}\) = {bit}\b')
+
+
+class AvailabilityFilterPlanTest(TestCase):
+    """필수 조건 필터가 부분 인덱스 / GiST 인덱스를 타는지 EXPLAIN 으로 확인"""
+
+    def setUp(self):
+        from django.contrib.gis.geos import Point
+        for i, (ecmo, icu) in enumerate([('Y', 2), ('N', 0), ('Y', 0)]):
+            hospital = Hospital.objects.create(hpid=f"A{i}", name=f"병원{i}", location=Point(127.0 + i * 0.01, 37.5, srid=4326))
+            values = {'hvecmoayn': ecmo, 'hvicc': icu}
+            HospitalRealtimeStatus.objects.create(hospital=hospital, **values, **encode_compact(values))
+        with connection.cursor() as cursor:
+            # 행이 몇 개 없으면 순차 탐색이 선택되므로 끄고 인덱스 사용 가능 여부만 확인
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_required_facilities_use_partial_indexes(self):
+        queryset = HospitalRealtimeStatus.objects.filter(availability_q(['hvecmoayn', 'hvicc']))
+        plan = queryset.explain()
+
+        self.assertEqual(list(queryset.values_list('hospital_id', flat=True)), ["A0"])
+        self.assertRegex(plan, r'(Index Scan using|Bitmap Index Scan on) rt_(ecmo_avail|hvicc_free)_idx')
+
+    def test_radius_filter_uses_gist_index(self):
+        from django.contrib.gis.geos import Point
+        from django.contrib.gis.measure import D
+        queryset = Hospital.objects.filter(
+            availability_q(['hvecmoayn'], prefix='realtime_status__'),
+            location__dwithin=(Point(127.0, 37.5, srid=4326), D(km=5)),
+        )
+        plan = queryset.explain()
+
+        self.assertEqual(sorted(queryset.values_list('hpid', flat=True)), ["A0", "A2"])
+        # PointField 의 공간 인덱스 이름은 "<테이블>_<컬럼>_id" (PostGIS 스키마 에디터 규칙)
+        gist_index = f"{Hospital._meta.db_table}_location_id"
+        self.assertRegex(plan, rf'(Index Scan using|Bitmap Index Scan on) {gist_index}\b')
+
+
+class IterJsonArrayTest(SimpleTestCase):
+    def test_items_split_across_chunks(self):
+        source = io.StringIO('[{"yadmNm": "병원, A", "XPos": "127.1"}, 1234 ,{"addr": "[x]"}]')
+        items = list(iter_json_array(source, chunk_size=5))
+
+        self.assertEqual(items, [{"yadmNm": "병원, A", "XPos": "127.1"}, 1234, {"addr": "[x]"}])
+
+
+class LoadHospitalsMatchTest(SimpleTestCase):
+    def test_same_name_in_other_city_is_not_matched(self):
+        from .management.commands.load_hospitals_json import Command
+
+        seoul = Hospital(hpid="A1", name="강남병원", address="서울특별시 강남구 테헤란로 1", latitude=37.50, longitude=127.03)
+        by_name, by_address = {"강남병원": [seoul]}, {"서울특별시강남구테헤란로1": [seoul]}
+        command = Command()
+
+        # 주소 표기가 달라도 좌표가 가까우면 같은 병원
+        near = {"yadmNm": "강남병원", "addr": "서울 강남구 테헤란로 1", "XPos": "127.031", "YPos": "37.501"}
+        self.assertIs(command.match(near, by_name, by_address), seoul)
+        # 이름만 같은 다른 도시 병원
+        busan = {"yadmNm": "강남병원", "addr": "부산광역시 해운대구 센텀로 2", "XPos": "129.13", "YPos": "35.17"}
+        self.assertIsNone(command.match(busan, by_name, by_address))
+
+
+class HospitalListCacheTest(SimpleTestCase):
+    def test_overlay_bookmarks_leaves_cached_payload_untouched(self):
+        payload = {"result": True, "count": 2, "data": {"서울특별시": [
+            {"hpid": "A1", "is_bookmarked": False}, {"hpid": "A2", "is_bookmarked": False},
+        ]}}
+        overlaid = overlay_bookmarks(payload, {"A2"})
+
+        self.assertEqual([item['is_bookmarked'] for item in overlaid['data']["서울특별시"]], [False, True])
+        self.assertFalse(payload['data']["서울특별시"][1]['is_bookmarked'])
+        self.assertEqual(overlaid['count'], 2)
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_invalidate_only_changed_region(self):
+        seoul, busan = list_cache.generation("서울특별시"), list_cache.generation("부산광역시")
+        list_cache.invalidate(["서울특별시"])
+
+        self.assertNotEqual(list_cache.generation("서울특별시"), seoul)
+        self.assertEqual(list_cache.generation("부산광역시"), busan)
+
+        list_cache.invalidate()
+        self.assertNotEqual(list_cache.generation("부산광역시"), busan)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+@patch('hospitals.list_cache.region_index', return_value=[{"region": "서울특별시", "count": 2}])
+class HospitalListViewCacheTest(SimpleTestCase):
+    payload = {"result": True, "count": 2, "data": {"서울특별시": [
+        {"hpid": "A1", "is_bookmarked": False}, {"hpid": "A2", "is_bookmarked": False},
+    ]}}
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        list_cache._local.clear()
+
+    def get(self, user=None, **headers):
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .views import HospitalListView
+
+        request = APIRequestFactory().get('/hospitals/', **headers)
+        if user:
+            force_authenticate(request, user=user)
+        response = HospitalListView.as_view()(request)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def test_gzip_body_and_conditional_get(self, mock_regions):
+        import gzip
+        import json
+
+        with patch('hospitals.list_cache.build_payload', return_value=self.payload) as build:
+            compressed = self.get(HTTP_ACCEPT_ENCODING='gzip, deflate')
+            plain = self.get()
+            not_modified = self.get(HTTP_IF_NONE_MATCH=compressed['ETag'])
+
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(compressed.content)), self.payload)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(json.loads(plain.content), self.payload)
+        self.assertEqual(plain['ETag'], compressed['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+    def test_etag_changes_with_bookmarks_and_new_generation(self, mock_regions):
+        import json
+
+        with patch('hospitals.list_cache.build_payload', return_value=self.payload):
+            anonymous = self.get()
+            with patch('hospitals.views.bookmarks.bookmarked_hpids', return_value={"A2"}):
+                bookmarked = self.get(user=MagicMock(is_authenticated=True, id=7), HTTP_IF_NONE_MATCH=anonymous['ETag'])
+
+        # 찜 목록이 ETag 에 들어가므로 비로그인 ETag 로는 304 가 나오지 않음
+        self.assertEqual(bookmarked.status_code, 200)
+        self.assertNotEqual(bookmarked['ETag'], anonymous['ETag'])
+        items = json.loads(bookmarked.content)['data']["서울특별시"]
+        self.assertEqual([item['is_bookmarked'] for item in items], [False, True])
+
+        changed = dict(self.payload, count=1, data={"서울특별시": self.payload['data']["서울특별시"][:1]})
+        list_cache.invalidate(["서울특별시"])
+        with patch('hospitals.list_cache.build_payload', return_value=changed):
+            refreshed = self.get(HTTP_IF_NONE_MATCH=anonymous['ETag'])
+
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed['ETag'], anonymous['ETag'])
+        self.assertEqual(json.loads(refreshed.content)['count'], 1)
+
+
+class ReviewStatsTest(SimpleTestCase):
+    @patch('hospitals.review_stats.Hospital.objects')
+    def test_rating_edit_moves_histogram_bucket_only(self, mock_objects):
+        apply_review_change("A1", old_rating=2, new_rating=5)
+
+        mock_objects.filter.assert_called_once_with(hpid="A1")
+        updates = mock_objects.filter.return_value.update.call_args.kwargs
+        self.assertEqual(
+            {field: expr.rhs.value for field, expr in updates.items()},
+            {"rating_sum": 3, "rating_2": -1, "rating_5": 1},
+        )
+
+
+class ReviewDeleteStatsTest(TestCase):
+    def test_second_delete_does_not_decrement_again(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIRequestFactory, force_authenticate
+        from .models import Review
+        from .views import ReviewDetailView
+
+        user = get_user_model().objects.create(username="reviewer")
+        hospital = Hospital.objects.create(hpid="A1", name="병원", review_count=1, rating_sum=4, rating_4=1)
+        review = Review.objects.create(hospital=hospital, user=user, content="좋아요", rating=4)
+
+        factory = APIRequestFactory()
+        # 두 요청이 같은 리뷰를 읽은 뒤 차례로 지우는 경우
+        with patch.object(ReviewDetailView, 'get_object', return_value=review):
+            for _ in range(2):
+                request = factory.delete(f'/hospitals/reviews/{review.id}/')
+                force_authenticate(request, user=user)
+                self.assertEqual(ReviewDetailView.as_view()(request, review_id=review.id).status_code, 204)
+
+        hospital.refresh_from_db()
+        self.assertEqual((hospital.review_count, hospital.rating_sum, hospital.rating_4), (0, 0, 0))
+
+
+class CommentCountTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.test import APIRequestFactory
+        from .models import Review
+
+        self.factory = APIRequestFactory()
+        self.user = get_user_model().objects.create(username="commenter")
+        hospital = Hospital.objects.create(hpid="A1", name="병원")
+        self.review = Review.objects.create(hospital=hospital, user=self.user, content="리뷰", rating=5)
+
+    def request(self, method, path, data=None):
+        from rest_framework.test import force_authenticate
+        request = getattr(self.factory, method)(path, data, format='json')
+        force_authenticate(request, user=self.user)
+        return request
+
+    def test_count_follows_create_and_delete_once(self):
+        from .models import Comment
+        from .views import CommentDetailView, CommentView
+
+        for i in range(2):
+            response = CommentView.as_view()(self.request('post', '/comments/', {"content": f"댓글{i}"}), review_id=self.review.id)
+            self.assertEqual(response.status_code, 201)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.comment_count, 2)
+
+        comment = Comment.objects.first()
+        # 두 요청이 같은 댓글을 차례로 지우는 경우
+        with patch.object(CommentDetailView, 'get_object', return_value=comment):
+            for _ in range(2):
+                CommentDetailView.as_view()(self.request('delete', f'/comments/{comment.id}/'), comment_id=comment.id)
+        self.review.refresh_from_db()
+        self.assertEqual(self.review.comment_count, 1)
+
+    def test_cursor_pagination_walks_all_comments_in_order(self):
+        from .models import Comment
+        from .views import CommentView
+
+        for i in range(5):
+            Comment.objects.create(review=self.review, user=self.user, content=f"댓글{i}")
+
+        seen, path = [], '/comments/?limit=2'
+        while path:
+            response = CommentView.as_view()(self.factory.get(path), review_id=self.review.id)
+            seen += [c['content'] for c in response.data['results']]
+            path = response.data['next']
+        self.assertEqual(seen, [f"댓글{i}" for i in range(5)])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class BookmarkSetCacheTest(SimpleTestCase):
+    @patch('hospitals.bookmarks.BookMark.objects')
+    def test_set_is_cached_until_invalidated(self, mock_objects):
+        mock_objects.filter.return_value.values_list.return_value = ["A1", "A2"]
+
+        self.assertEqual(bookmarks.bookmarked_hpids(7), {"A1", "A2"})
+        self.assertEqual(bookmarks.bookmarked_hpids(7), {"A1", "A2"})
+        self.assertEqual(mock_objects.filter.call_count, 1)
+
+        bookmarks.invalidate(7)
+        bookmarks.bookmarked_hpids(7)
+        self.assertEqual(mock_objects.filter.call_count, 2)
+
+    @patch('hospitals.bookmarks.transaction.on_commit')
+    @patch('hospitals.bookmarks.invalidate')
+    @patch('hospitals.bookmarks.BookMark.objects')
+    def test_remove_invalidates_after_commit(self, mock_objects, mock_invalidate, mock_on_commit):
+        mock_objects.filter.return_value.delete.return_value = (1, {})
+
+        bookmarks.remove_bookmarks(MagicMock(id=7), ["A1"])
+        mock_invalidate.assert_not_called()
+
+        mock_on_commit.call_args.args[0]()
+        mock_invalidate.assert_called_once_with(7)
+
+
+class LogPartitionNamingTest(SimpleTestCase):
+    def test_month_arithmetic_and_names(self):
+        from datetime import datetime
+        start = datetime(2025, 11, 1)
+
+        self.assertEqual(add_months(start, 2), datetime(2026, 1, 1))
+        self.assertEqual(add_months(start, -11), datetime(2024, 12, 1))
+        self.assertEqual(partition_name("accounts_userlog", start), "accounts_userlog_p202511")
+        self.assertEqual(partition_month("accounts_userlog", "accounts_userlog_p202511").month, 11)
+        self.assertIsNone(partition_month("accounts_userlog", "accounts_userlog_legacy"))
+
+    @patch('hospitals.partitions.connection')
+    @patch('hospitals.partitions.list_partitions', return_value=["accounts_userlog_p200001"])
+    def test_refuses_to_drop_without_archive_dir(self, mock_list, mock_connection):
+        from accounts.models import ParamedicAuthHistory, UserLog
+        from .partitions import RETENTION_MONTHS, archive_partitions
+
+        with self.assertRaises(ValueError):
+            archive_partitions(UserLog, retain_months=12)
+        mock_connection.cursor.assert_not_called()
+        self.assertIn(ParamedicAuthHistory, RETENTION_MONTHS)
+
+    @patch('hospitals.partitions.transaction')
+    @patch('hospitals.partitions.connection')
+    def test_ensure_moves_rows_out_of_default_partition(self, mock_connection, mock_transaction):
+        from datetime import datetime
+        from django.utils import timezone
+        from accounts.models import UserLog
+        from .partitions import ensure_partitions, month_start
+
+        cursor = mock_connection.cursor.return_value.__enter__.return_value
+        # 2000년 1월 파티션이 없어 DEFAULT 로 들어간 행
+        cursor.fetchall.return_value = [(timezone.make_aware(datetime(2000, 1, 15)),)]
+        cursor.rowcount = 7
+        existing = [partition_name("accounts_userlog", month_start()), "accounts_userlog_default"]
+        with patch('hospitals.partitions.list_partitions', return_value=existing):
+            created = ensure_partitions(UserLog, months_ahead=1)
+
+        self.assertEqual(created, ["accounts_userlog_p200001", partition_name("accounts_userlog", add_months(month_start(), 1))])
+        sql = [call.args[0] for call in cursor.execute.call_args_list]
+        self.assertFalse(any('PARTITION OF "accounts_userlog" DEFAULT' in q for q in sql))
+        self.assertTrue(any(q.startswith('WITH moved AS (DELETE FROM "accounts_userlog_default"') for q in sql))
+        self.assertTrue(any('ATTACH PARTITION "accounts_userlog_p200001"' in q for q in sql))
+
+
+class LogRollupTest(TestCase):
+    def test_rollup_only_adds_new_rows(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from .models import RequestCountHourly, SymptomSearchHourly, SymptomSearchLog
+
+        def log(symptoms):
+            SymptomSearchLog.objects.create(latitude=37.56, longitude=126.97, sign_kind=2, symptoms=symptoms)
+            SymptomSearchLog.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+        log("두통,발열")
+        log("발열")
+        rollups.rollup()
+        rollups.rollup()  # 새 행이 없으면 아무것도 더하지 않음
+        log("발열")
+        rollups.rollup()
+
+        counts = dict(SymptomSearchHourly.objects.values_list('symptom', 'count'))
+        self.assertEqual(counts, {"두통": 1, "발열": 3})
+        self.assertEqual(SymptomSearchHourly.objects.first().grid_lat, 375)
+        self.assertEqual(RequestCountHourly.objects.get(source='symptom', sign_kind=2).count, 3)
+
+    def test_long_token_truncated_and_region_from_nearest_hospital(self):
+        from datetime import timedelta
+        from django.contrib.gis.geos import Point
+        from django.utils import timezone
+        from .models import RollupWatermark, SymptomSearchHourly, SymptomSearchLog
+
+        Hospital.objects.create(hpid="S1", name="서울병원", first_address="서울특별시", location=Point(126.98, 37.57, srid=4326))
+        Hospital.objects.create(hpid="G1", name="경기병원", first_address="경기도", location=Point(127.03, 37.27, srid=4326))
+        long_token = "가" * 150
+        log = SymptomSearchLog.objects.create(latitude=37.56, longitude=126.97, symptoms=f"{long_token},발열")
+        SymptomSearchLog.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+        rollups.rollup()
+
+        self.assertEqual(RollupWatermark.objects.get(name=SymptomSearchLog._meta.db_table).last_id, log.id)
+        rows = dict(SymptomSearchHourly.objects.values_list('symptom', 'region'))
+        self.assertEqual(rows, {"가" * 100: "서울특별시", "발열": "서울특별시"})
+        self.assertEqual(rollups.top_symptoms(timezone.now() - timedelta(days=1), region="경기도"), [])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RecommendCacheTest(SimpleTestCase):
+    def test_key_shared_within_cell_and_reset_by_sync(self):
+        key = recommend_cache.make_key(["발열", "두통"], "M", "34", 37.5665, 126.9780)
+        # 증상 순서/공백, 같은 연령대, 약 50m 떨어진 위치는 같은 키
+        self.assertEqual(key, recommend_cache.make_key([" 두통", "발열"], "M", "38", 37.5669, 126.9782))
+        self.assertNotEqual(key, recommend_cache.make_key(["발열", "두통"], "M", "45", 37.5665, 126.9780))
+        self.assertNotEqual(key, recommend_cache.make_key(["발열", "두통"], "M", "34", 37.5865, 126.9780))
+
+        recommend_cache.invalidate()
+        self.assertNotEqual(key, recommend_cache.make_key(["발열", "두통"], "M", "34", 37.5665, 126.9780))
+
+    def test_distance_recomputed_for_exact_location(self):
+        hospitals = [
+            {"hpid": "A1", "latitude": 37.60, "longitude": 126.98, "raw_score": 50},
+            {"hpid": "A2", "latitude": 37.57, "longitude": 126.98, "raw_score": 80},
+        ]
+        located = recommend_cache.with_distance(hospitals, 37.5665, 126.9780)
+
+        self.assertEqual([h['hpid'] for h in located], ["A2", "A1"])
+        self.assertAlmostEqual(located[1]['distance'], 3.75, delta=0.05)
+        self.assertNotIn('distance', hospitals[0])
+
+    def test_cached_distance_uses_location_and_skips_unknown(self):
+        hospitals = [
+            # latitude/longitude 컬럼은 비었지만 location 으로 후보가 된 병원
+            {"hpid": "A1", "latitude": None, "longitude": None, "raw_score": 50, "_point": (37.57, 126.98)},
+            {"hpid": "A2", "latitude": None, "longitude": None, "raw_score": 80, "_point": None},
+        ]
+        located = recommend_cache.with_distance(hospitals, 37.5665, 126.9780)
+
+        self.assertEqual([h['hpid'] for h in located], ["A1"])
+        self.assertLess(located[0]['distance'], 1)
+        self.assertNotIn('_point', located[0])
+
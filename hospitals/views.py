@@ -4,17 +4,33 @@ from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from datetime import timedelta
-from .models import UserLocationLog, HospitalRealtimeStatus, Hospital, Review, Comment, SymptomSearchLog, BookMark, ChatSession
+from .models import UserLocationLog, HospitalRealtimeStatus, Hospital, Review, Comment, SymptomSearchLog, BookMark, ChatSession, HospitalSevereMessage
 from .serializers import HospitalResponseSerializer, ReviewSerializer, CommentSerializer, HospitalListSerializer
 from .constants import HOSPITAL_FIELD_DESC
 from .chatbot import ChatbotService
+from accounts.log_writer import write_log
+from . import realtime_feed
+from . import list_cache
+from . import bookmarks
+from .review_stats import apply_review_change
+from .pagination import ReviewCursorPagination, CommentCursorPagination
+from django.db import transaction
+from .history import bed_curve
+from .forecast import predict_hvec
+from . import rollups
+from . import recommend_cache
+from .models import BED_HISTORY_FIELDS, availability_q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.conf import settings
 from django.contrib.gis.geos import Point
 from django.contrib.gis.db.models.functions import Distance
-from django.db.models import Case, When, F, Value, FloatField, Avg, Count, Exists, OuterRef, BooleanField
+from django.db.models import Case, When, F, FloatField
 import requests
+import gzip
+import hashlib
 import json
 import math
+import time
 import urllib3
 
 # InsecureRequestWarning 경고 억제 (gms.ssafy.io 인증서 문제 대응)
@@ -22,6 +38,18 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 USE_NMC_API = False 
 
+def parse_required_facilities(value):
+    """필수 장비/병상 파라미터 (리스트 또는 'hvecmoayn,hvicc') -> 필드명 리스트"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [name.strip() for name in value if name and name.strip()]
+
+def get_required_facilities(params):
+    """요청 데이터/쿼리의 필수 조건. 두 엔드포인트 모두 required_facilities 를 쓰고 required 도 같은 뜻으로 받음"""
+    return parse_required_facilities(params.get('required_facilities') or params.get('required'))
+
 class BookMarkView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -34,12 +62,14 @@ class BookMarkView(APIView):
         if not created:
             # 이미 존재하면 삭제 (Toggle)
             bookmark.delete()
+            bookmarks.invalidate_on_commit(user.id)
             return Response({
                 "result": True,
                 "is_bookmarked": False,
                 "message": "찜 목록에서 삭제되었습니다."
             }, status=status.HTTP_200_OK)
-        
+
+        bookmarks.invalidate_on_commit(user.id)
         return Response({
             "result": True,
             "is_bookmarked": True,
@@ -53,6 +83,7 @@ class BookMarkView(APIView):
         try:
             bookmark = BookMark.objects.get(user=user, hospital=hospital)
             bookmark.delete()
+            bookmarks.invalidate_on_commit(user.id)
             return Response({
                 "result": True,
                 "is_bookmarked": False,
@@ -65,6 +96,35 @@ class BookMarkView(APIView):
                 "message": "찜 목록에 존재하지 않습니다."
             }, status=status.HTTP_404_NOT_FOUND)
 
+class BookMarkBatchView(APIView):
+    """
+    여러 병원 찜 추가/삭제를 한 번에
+    POST {"add": ["A1", "A2"], "remove": ["B1"]}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    MAX_ITEMS = 200
+
+    def post(self, request):
+        add = request.data.get('add') or []
+        remove = request.data.get('remove') or []
+        if not isinstance(add, list) or not isinstance(remove, list):
+            return Response({"result": False, "message": "add, remove 는 hpid 목록이어야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(add) + len(remove) > self.MAX_ITEMS:
+            return Response({"result": False, "message": f"한 번에 최대 {self.MAX_ITEMS}개까지 처리할 수 있습니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        with transaction.atomic():
+            added = bookmarks.add_bookmarks(user, set(add) - set(remove)) if add else set()
+            removed = bookmarks.remove_bookmarks(user, set(remove)) if remove else 0
+
+        return Response({
+            "result": True,
+            "added": sorted(added),
+            "removed_count": removed,
+            "not_found": sorted(set(add) - set(remove) - added),
+            "bookmarked": sorted(bookmarks.bookmarked_hpids(user.id)),
+        }, status=status.HTTP_200_OK)
+
 class ChatbotView(APIView):
     permission_classes = [permissions.AllowAny] # 누구나 사용 가능
 
@@ -135,7 +195,7 @@ class UserLocationView(APIView):
             # 요구사항: 반경은 50km로 항상 고정
             final_radius = 50 
 
-            UserLocationLog.objects.create(
+            write_log(UserLocationLog(
                 user=user,
                 user_email=user_email or user.email,
                 sign_kind=final_sign_kind,
@@ -143,7 +203,7 @@ class UserLocationView(APIView):
                 longitude=float(lon),
                 radius=final_radius,
                 location_text=loc_text or ''
-            )
+            ))
 
             if user.is_authenticated:
                 user.latitude = float(lat)
@@ -204,10 +264,13 @@ class GeneralSymptomView(APIView):
         gender = data.get('gender') 
         age = data.get('age')       
         refresh = data.get('refresh', False)
+        use_forecast = data.get('use_forecast', False) # 도착 시점 예상 병상 수로 점수 계산
         req_sign_kind = data.get('sign_kind')
 
         if isinstance(refresh, str):
             refresh = refresh.lower() == "true"
+        if isinstance(use_forecast, str):
+            use_forecast = use_forecast.lower() == "true"
 
         # sign_kind는 로그용으로만 사용 (유저 식별은 request.user로 충분)
         final_sign_kind = 1
@@ -249,38 +312,32 @@ class GeneralSymptomView(APIView):
              return Response({"result": False, "message": "User location not found."}, status=status.HTTP_400_BAD_REQUEST)
 
         radius = 50
+
+        # 필수 장비/병상 (예: ["hvecmoayn", "hvicc"]) - DB 조회 조건으로 바로 반영
+        required = get_required_facilities(data)
+        try:
+            availability_q(required)
+        except ValueError as e:
+            return Response({"result": False, "message": f"지원하지 않는 필수 조건: {e}"}, status=status.HTTP_400_BAD_REQUEST)
         
         symptoms_str = ",".join(sorted(symptoms)) if symptoms else ""
-        
-        recent_log = SymptomSearchLog.objects.filter(
-            symptoms=symptoms_str,
-            gender=gender,
-            age=age,
-            created_at__gte=timezone.now() - timedelta(hours=1),
-            ai_recommended_fields__isnull=False
-        ).order_by('-created_at').first()
 
-        cached_data = recent_log
-        
-        if not cached_data:
-            cached_data = SymptomSearchLog.objects.filter(
-                symptoms=symptoms_str,
-                gender=gender,
-                age=age,
-                ai_recommended_fields__isnull=False
-            ).order_by('-created_at').first()
+        # 같은 셀/증상/성별/연령대 결과가 있으면 AI 조회와 점수 계산을 건너뛰고 거리만 다시 계산
+        cache_key = None
+        cached_result = None
+        if recommend_cache.enabled() and not USE_NMC_API:
+            cache_key = recommend_cache.make_key(symptoms, gender, age, user_lat, user_lon, required, use_forecast)
+            cached_result = recommend_cache.get(cache_key)
 
-        if cached_data:
-            recommended_fields = cached_data.ai_recommended_fields
-            openai_comment = cached_data.openai_comment
+        if cached_result:
+            recommended_fields = cached_result['fields']
+            openai_comment = cached_result['comment']
         else:
-            ai_response = self.get_recommended_fields(symptoms, gender, age)
-            recommended_fields = ai_response.get('fields', {})
-            openai_comment = ai_response.get('comment', "분석 결과가 없습니다.")
+            recommended_fields, openai_comment = self.get_cached_recommendation(symptoms, symptoms_str, gender, age)
 
         # 로그 저장
         try:
-            SymptomSearchLog.objects.create(
+            write_log(SymptomSearchLog(
                 user=user if user.is_authenticated else None,
                 user_email=user.email if user.is_authenticated else "anonymous",
                 latitude=user_lat,
@@ -292,44 +349,113 @@ class GeneralSymptomView(APIView):
                 age=age,
                 ai_recommended_fields=recommended_fields,
                 openai_comment=openai_comment
-            )
+            ))
         except Exception as e:
             print(f"SymptomSearchLog Save Error: {e}")
 
-        if USE_NMC_API:
-            nearby_hospitals = self.get_nearby_hospitals_from_api(user_lat, user_lon)
+        if cached_result:
+            processed_data = recommend_cache.with_distance(cached_result['hospitals'], user_lat, user_lon)
         else:
-            nearby_hospitals = self.get_nearby_hospitals_from_db(user_lat, user_lon)
+            if USE_NMC_API:
+                nearby_hospitals = self.get_nearby_hospitals_from_api(user_lat, user_lon)
+            else:
+                # 캐시에 넣을 후보는 셀 안 다른 위치에서도 쓸 수 있도록 조금 넓게
+                margin = recommend_cache.CELL_MARGIN_KM if cache_key else 0
+                nearby_hospitals = self.get_nearby_hospitals_from_db(user_lat, user_lon, required, radius_km=radius + margin)
+            processed_data = self.score_hospitals(nearby_hospitals, recommended_fields, use_forecast)
+            if cache_key:
+                recommend_cache.store(
+                    cache_key, recommended_fields, openai_comment, processed_data,
+                    points={item['hpid']: item['point'] for item in nearby_hospitals if item.get('point')},
+                )
+
+        if cache_key:
+            # 넓게 잡은 후보 중 현재 위치 기준 반경 밖은 제외
+            processed_data = [h for h in processed_data if h['distance'] <= radius]
+        filtered_hospitals = self.filter_by_radius(processed_data, radius)
+
+        max_total_score = max((h['raw_score'] for h in filtered_hospitals), default=0)
+        for hospital in filtered_hospitals:
+            if max_total_score > 0:
+                normalized_score = round((hospital['raw_score'] / max_total_score) * 100)
+            else:
+                normalized_score = 0
+            hospital['score'] = normalized_score
+
+        sorted_by_distance_data = sorted(filtered_hospitals, key=lambda x: x['distance'])
+        serialized_distance = HospitalResponseSerializer(sorted_by_distance_data, many=True).data
+        
+        sorted_by_score_data = sorted(filtered_hospitals, key=lambda x: x['score'], reverse=True)
+        serialized_score = HospitalResponseSerializer(sorted_by_score_data, many=True).data
         
-        filtered_hospitals = self.filter_by_radius(nearby_hospitals, radius)
+        return Response({
+            "result": True,
+            "sorted_by_distance": serialized_distance,
+            "sorted_by_score": serialized_score,
+            "openai_recommendation": recommended_fields,
+            "openai_comment": openai_comment
+        }, status=status.HTTP_200_OK)
+
+    def get_cached_recommendation(self, symptoms, symptoms_str, gender, age):
+        """같은 증상/성별/나이의 이전 AI 추천 결과가 있으면 재사용 -> (추천 필드, 코멘트)"""
+        recent_log = SymptomSearchLog.objects.filter(
+            symptoms=symptoms_str,
+            gender=gender,
+            age=age,
+            created_at__gte=timezone.now() - timedelta(hours=1),
+            ai_recommended_fields__isnull=False
+        ).order_by('-created_at').first()
+
+        cached_data = recent_log
         
+        if not cached_data:
+            cached_data = SymptomSearchLog.objects.filter(
+                symptoms=symptoms_str,
+                gender=gender,
+                age=age,
+                ai_recommended_fields__isnull=False
+            ).order_by('-created_at').first()
+
+        if cached_data:
+            return cached_data.ai_recommended_fields, cached_data.openai_comment
+        ai_response = self.get_recommended_fields(symptoms, gender, age)
+        return ai_response.get('fields', {}), ai_response.get('comment', "분석 결과가 없습니다.")
+
+    def score_hospitals(self, nearby_hospitals, recommended_fields, use_forecast=False):
+        """후보 병원별 점수/표시 정보 (정규화 점수 score 는 반경 필터 후 계산)"""
         processed_data = []
-        max_total_score = 0 
 
-        for item in filtered_hospitals:
+        # 후보 병원의 실시간 정보를 한 번에 조회
+        realtime_map = {
+            rt.hospital_id: rt
+            for rt in HospitalRealtimeStatus.objects.filter(hospital_id__in=[item['hpid'] for item in nearby_hospitals])
+        }
+        # 현재 유효한 중증 메시지만 한 번에 조회
+        severe_map = {}
+        for msg in HospitalSevereMessage.objects.active().filter(hospital_id__in=realtime_map).order_by('-start_at', '-created_at'):
+            severe_map.setdefault(msg.hospital_id, []).append({
+                "message": msg.message,
+                "created_at": msg.created_at.strftime('%Y-%m-%d %H:%M:%S') if msg.created_at else ""
+            })
+        predicted = {}
+        if use_forecast:
+            predicted = predict_hvec([
+                (item['hpid'], realtime_map[item['hpid']].hvec, item['distance'])
+                for item in nearby_hospitals if item['hpid'] in realtime_map
+            ])
+
+        for item in nearby_hospitals:
             hpid = item['hpid']
             distance = item['distance']
             
-            try:
-                realtime_data = HospitalRealtimeStatus.objects.get(hospital__hpid=hpid)
-            except HospitalRealtimeStatus.DoesNotExist:
-                realtime_data = None
+            realtime_data = realtime_map.get(hpid)
             
             if not realtime_data:
                 continue
 
-            from .models import HospitalSevereMessage
-            severe_msgs = HospitalSevereMessage.objects.filter(hospital__hpid=hpid).order_by('-created_at')
-            severe_messages_list = [
-                {
-                    "message": msg.message,
-                    "created_at": msg.created_at.strftime('%Y-%m-%d %H:%M:%S') if msg.created_at else ""
-                } for msg in severe_msgs
-            ]
+            severe_messages_list = severe_map.get(hpid, [])
 
-            raw_score, matched_reasons = self.calculate_score(realtime_data, recommended_fields)
-            if raw_score > max_total_score:
-                max_total_score = raw_score
+            raw_score, matched_reasons = self.calculate_score(realtime_data, recommended_fields, predicted.get(hpid))
             
             hvec = realtime_data.hvec if realtime_data else 0
             hvs01 = realtime_data.hvs01 if realtime_data else 0 
@@ -351,6 +477,7 @@ class GeneralSymptomView(APIView):
                 "longitude": item['longitude'],
                 "hvec": hvec,   
                 "hvs01": hvs01, 
+                "predicted_hvec": predicted.get(hpid),
                 "severe_messages": severe_messages_list,
                 "ai_matches": ai_matches,
                 "matched_reasons": matched_reasons, 
@@ -358,27 +485,7 @@ class GeneralSymptomView(APIView):
                 "description": item.get('description'),
             }
             processed_data.append(hospital_info)
-            
-        for hospital in processed_data:
-            if max_total_score > 0:
-                normalized_score = round((hospital['raw_score'] / max_total_score) * 100)
-            else:
-                normalized_score = 0
-            hospital['score'] = normalized_score
-
-        sorted_by_distance_data = sorted(processed_data, key=lambda x: x['distance'])
-        serialized_distance = HospitalResponseSerializer(sorted_by_distance_data, many=True).data
-        
-        sorted_by_score_data = sorted(processed_data, key=lambda x: x['score'], reverse=True)
-        serialized_score = HospitalResponseSerializer(sorted_by_score_data, many=True).data
-        
-        return Response({
-            "result": True,
-            "sorted_by_distance": serialized_distance,
-            "sorted_by_score": serialized_score,
-            "openai_recommendation": recommended_fields,
-            "openai_comment": openai_comment
-        }, status=status.HTTP_200_OK)
+        return processed_data
 
     def get_recommended_fields(self, symptoms, gender=None, age=None):
         url = "https://gms.ssafy.io/gmsapi/api.openai.com/v1/chat/completions"
@@ -467,26 +574,35 @@ class GeneralSymptomView(APIView):
             return results
         except: return []
 
-    def get_nearby_hospitals_from_db(self, lat, lon):
+    def get_nearby_hospitals_from_db(self, lat, lon, required=(), radius_km=50):
         from django.contrib.gis.measure import D
         user_location = Point(lon, lat, srid=4326)
-        hospitals = Hospital.objects.filter(location__dwithin=(user_location, D(km=50)), realtime_status__isnull=False).annotate(distance_obj=Distance('location', user_location)).order_by('distance_obj')
-        return [{'hpid': h.hpid, 'name': h.name, 'address': h.address, 'phone': h.main_phone, 'er_phone': h.emergency_phone, 'latitude': h.latitude, 'longitude': h.longitude, 'distance': round(h.distance_obj.km, 2), 'description': h.description} for h in hospitals]
+        hospitals = Hospital.objects.filter(
+            availability_q(required, prefix='realtime_status__'),
+            location__dwithin=(user_location, D(km=radius_km)), realtime_status__isnull=False,
+        ).annotate(distance_obj=Distance('location', user_location)).order_by('distance_obj')
+        return [{'hpid': h.hpid, 'name': h.name, 'address': h.address, 'phone': h.main_phone, 'er_phone': h.emergency_phone, 'latitude': h.latitude, 'longitude': h.longitude, 'distance': round(h.distance_obj.km, 2), 'description': h.description, 'point': (h.location.y, h.location.x)} for h in hospitals]
 
     def filter_by_radius(self, hospitals, radius):
         in_radius = [h for h in hospitals if h['distance'] <= radius]
         return in_radius if len(in_radius) >= 5 else hospitals[:5]
 
-    def calculate_score(self, realtime_data, recommended_fields):
+    def calculate_score(self, realtime_data, recommended_fields, predicted_hvec=None):
+        # predicted_hvec: 도착 시점 예상 병상 수 (있으면 현재 hvec 대신 사용)
         score = 0
         matched_reasons = []
         if not realtime_data: return 0, ["실시간 데이터 없음"]
-        hvec = realtime_data.hvec if realtime_data.hvec > 0 else 0
+        if predicted_hvec is not None:
+            hvec = max(predicted_hvec, 0)
+            label = "응급실 일반 병상 (도착 시 예상)"
+        else:
+            hvec = realtime_data.hvec if realtime_data.hvec > 0 else 0
+            label = "응급실 일반 병상"
         if hvec > 0:
             bed_score = 40 + (hvec * 5)
             score += bed_score
-            matched_reasons.append(f"응급실 일반 병상 {hvec}개 (+{bed_score}점)")
-        else: matched_reasons.append("응급실 일반 병상 없음 (0점)")
+            matched_reasons.append(f"{label} {hvec}개 (+{bed_score}점)")
+        else: matched_reasons.append(f"{label} 없음 (0점)")
 
         for field, weight in recommended_fields.items():
             if not hasattr(realtime_data, field): continue
@@ -504,19 +620,31 @@ class HospitalListView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        hospitals = Hospital.objects.all().annotate(
-            average_rating=Avg('reviews__rating'),
-            review_count=Count('reviews')
-        ).order_by('first_address', 'name').prefetch_related('realtime_status', 'bookmarked_by')
-
-        if request.user.is_authenticated:
-            is_bookmarked_subquery = BookMark.objects.filter(
-                hospital=OuterRef('pk'),
-                user=request.user
-            )
-            hospitals = hospitals.annotate(is_bookmarked=Exists(is_bookmarked_subquery))
-        else:
-             hospitals = hospitals.annotate(is_bookmarked=Value(False, output_field=BooleanField()))
+        required = get_required_facilities(request.query_params)
+        try:
+            required_q = availability_q(required, prefix='realtime_status__')
+        except ValueError as e:
+            return Response({"result": False, "message": f"지원하지 않는 필수 조건: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # ?region=서울특별시 : 해당 시도만 (목록은 /hospitals/regions/)
+        region = request.query_params.get('region')
+        if region and region not in {r['region'] for r in list_cache.region_index()}:
+            return Response({"result": False, "message": f"알 수 없는 지역: {region}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 필터 없는 목록은 시도별 버전마다 미리 만들어 둔 본문 사용
+        if not required:
+            return self.cached_response(request, region)
+
+        # 평점/리뷰 수는 Hospital 에 집계된 값 사용 (average_rating 은 property)
+        hospitals = Hospital.objects.filter(required_q).order_by('first_address', 'name').prefetch_related('realtime_status', 'bookmarked_by')
+        if region:
+            hospitals = hospitals.filter(first_address='' if region == list_cache.OTHER_REGION else region)
+
+        # 찜 여부는 캐시된 사용자별 hpid 집합으로 (병원마다 Exists 서브쿼리 없이)
+        bookmarked = bookmarks.bookmarked_hpids(request.user.id) if request.user.is_authenticated else frozenset()
+        hospitals = list(hospitals)
+        for hospital in hospitals:
+            hospital.is_bookmarked = hospital.hpid in bookmarked
         
         grouped_data = {}
         serializer = HospitalListSerializer(hospitals, many=True, context={'request': request})
@@ -524,20 +652,216 @@ class HospitalListView(APIView):
             category = item.get('first_address') or "기타"
             if category not in grouped_data: grouped_data[category] = []
             grouped_data[category].append(item)
-        return Response({"result": True, "count": hospitals.count(), "data": grouped_data}, status=status.HTTP_200_OK)
+        return Response({"result": True, "count": len(hospitals), "data": grouped_data}, status=status.HTTP_200_OK)
+
+    def cached_response(self, request, region=None):
+        gen, etag, body = list_cache.get_rendered(HospitalListSerializer, {'request': request}, region)
+
+        bookmarked = set()
+        if request.user.is_authenticated:
+            bookmarked = bookmarks.bookmarked_hpids(request.user.id)
+            if bookmarked:
+                etag = hashlib.md5(f"{etag}:{','.join(sorted(bookmarked))}".encode()).hexdigest()
+        etag = f'"{etag}"'
+
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif bookmarked:
+            # 찜 여부만 덧씌우고 나머지는 캐시된 본문 그대로
+            response = Response(list_cache.overlay_bookmarks(list_cache.get_payload(gen, body), bookmarked), status=status.HTTP_200_OK)
+        elif 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(body, content_type='application/json; charset=utf-8')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(body), content_type='application/json; charset=utf-8')
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Accept-Encoding, Authorization'
+        return response
+
+class HospitalRegionIndexView(APIView):
+    """시도 목록과 시도별 병원 수 (HospitalListView ?region= 에 넘길 값)"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        regions = list_cache.region_index()
+        return Response({"result": True, "count": len(regions), "data": regions}, status=status.HTTP_200_OK)
+
+class RealtimeDeltaView(APIView):
+    """
+    실시간 병상 변경분 피드
+    GET ?last_id=<마지막으로 받은 id>&region=서울특별시&hpids=A1,A2
+      - 기본: long-poll. last_id 이후 변경분이 생길 때까지 최대 POLL_BLOCK_MS 대기
+        (long-poll/SSE 동시 연결이 프로세스당 REALTIME_MAX_STREAMS 를 넘으면 503 + Retry-After)
+      - last_id 없이 호출하면 현재 커서만 반환 (전체 데이터는 목록 API 로 받고 이후부터 구독)
+      - Accept: text/event-stream 이면 SSE 로 흘려보냄 (재연결 시 Last-Event-ID 사용)
+    연결이 많아지면 이 뷰만 별도 프로세스(ASGI 등)로 분리해 일반 API 워커와 나누는 것을 권장
+    """
+    permission_classes = [permissions.AllowAny]
+
+    POLL_BLOCK_MS = 10000
+    SSE_BLOCK_MS = 10000
+    # 워커 스레드를 오래 붙잡지 않도록 일정 시간 후 끊고 클라이언트가 재연결
+    SSE_MAX_SECONDS = 60
+    RETRY_AFTER_SECONDS = 5
+
+    def get(self, request):
+        region = request.query_params.get('region')
+        hpids = set(filter(None, request.query_params.get('hpids', '').split(',')))
+
+        def matches(delta):
+            if region and delta['region'] != region:
+                return False
+            if hpids and delta['hpid'] not in hpids:
+                return False
+            return True
+
+        if 'text/event-stream' in request.headers.get('Accept', ''):
+            # '$' 를 그대로 쓰면 XREAD 사이에 들어온 항목을 놓치므로 실제 id 로 고정
+            last_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_id') or realtime_feed.latest_id()
+            if not realtime_feed.valid_id(last_id):
+                return self.invalid_id(last_id)
+            if not realtime_feed.stream_slots.acquire(blocking=False):
+                return self.too_busy()
+            release = realtime_feed.slot_releaser()
+            response = StreamingHttpResponse(self.event_stream(last_id, matches, release), content_type='text/event-stream')
+            # HEAD 요청, 첫 청크 전 연결 끊김 등으로 스트림이 시작되지 않아도 응답 close 때 반환
+            response._resource_closers.append(release)
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # nginx 버퍼링 끄기
+            return response
+
+        last_id = request.query_params.get('last_id')
+        if not last_id:
+            return Response({"result": True, "last_id": realtime_feed.latest_id(), "changes": []}, status=status.HTTP_200_OK)
+        if not realtime_feed.valid_id(last_id):
+            return self.invalid_id(last_id)
+
+        if not realtime_feed.stream_slots.acquire(blocking=False):
+            return self.too_busy()
+        try:
+            entries = realtime_feed.read_deltas(last_id, block_ms=self.POLL_BLOCK_MS)
+        finally:
+            realtime_feed.stream_slots.release()
+        if entries:
+            # 필터에 걸리지 않는 변경분이라도 커서는 앞으로 보냄
+            last_id = entries[-1][0]
+        changes = [dict(delta, id=entry_id) for entry_id, delta in entries if matches(delta)]
+        return Response({"result": True, "last_id": last_id, "changes": changes}, status=status.HTTP_200_OK)
+
+    def invalid_id(self, last_id):
+        return Response({"result": False, "message": f"잘못된 last_id: {last_id}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    def too_busy(self):
+        response = Response({"result": False, "message": "실시간 연결이 많습니다. 잠시 후 다시 시도해 주세요."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(self.RETRY_AFTER_SECONDS)
+        return response
+
+    def event_stream(self, last_id, matches, release):
+        # stream_slots 는 get() 에서 잡고 스트림이 끝나거나 응답이 닫히면 반환 (release 는 한 번만 반환)
+        try:
+            deadline = time.monotonic() + self.SSE_MAX_SECONDS
+            yield "retry: 3000\n\n"
+            while time.monotonic() < deadline:
+                entries = realtime_feed.read_deltas(last_id, block_ms=self.SSE_BLOCK_MS)
+                if not entries:
+                    yield ": keep-alive\n\n"
+                    continue
+                for entry_id, delta in entries:
+                    last_id = entry_id
+                    if matches(delta):
+                        yield f"id: {entry_id}\nevent: delta\ndata: {json.dumps(delta, ensure_ascii=False)}\n\n"
+        finally:
+            release()
+
+class HospitalBedHistoryView(APIView):
+    """
+    병원의 시간대별 가용 병상 추이 (시간 단위 집계에서 바로 응답)
+    GET ?hours=24&fields=hvec,hvicc
+    """
+    permission_classes = [permissions.AllowAny]
+
+    MAX_HOURS = 24 * 90
+
+    def get(self, request, hpid):
+        try:
+            hours = min(max(int(request.query_params.get('hours', 24)), 1), self.MAX_HOURS)
+        except ValueError:
+            return Response({"result": False, "message": "hours는 숫자여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        fields = [f for f in request.query_params.get('fields', '').split(',') if f] or BED_HISTORY_FIELDS
+        unknown = [f for f in fields if f not in BED_HISTORY_FIELDS]
+        if unknown:
+            return Response({"result": False, "message": f"지원하지 않는 필드: {', '.join(unknown)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        get_object_or_404(Hospital, hpid=hpid)
+        return Response({"result": True, "hpid": hpid, "hours": hours, "data": bed_curve(hpid, hours, fields)}, status=status.HTTP_200_OK)
+
+class SymptomTrendView(APIView):
+    """
+    증상별 검색 수 상위 (시간 단위 집계에서 응답)
+    GET ?days=7&region=서울특별시&limit=20
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    MAX_DAYS = 365
+
+    def get(self, request):
+        try:
+            days = min(max(int(request.query_params.get('days', 7)), 1), self.MAX_DAYS)
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({"result": False, "message": "days, limit는 숫자여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        region = request.query_params.get('region')
+        if region and region not in {r['region'] for r in list_cache.region_index()}:
+            return Response({"result": False, "message": f"알 수 없는 지역: {region}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = timezone.now() - timedelta(days=days)
+        data = rollups.top_symptoms(since, region=region, limit=limit)
+        return Response({"result": True, "days": days, "region": region, "data": data}, status=status.HTTP_200_OK)
+
+class RequestVolumeView(APIView):
+    """
+    시간별 sign_kind 별 요청 수 (시간 단위 집계에서 응답)
+    GET ?hours=24&source=symptom|location
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    MAX_HOURS = 24 * 90
+
+    def get(self, request):
+        try:
+            hours = min(max(int(request.query_params.get('hours', 24)), 1), self.MAX_HOURS)
+        except ValueError:
+            return Response({"result": False, "message": "hours는 숫자여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        source = request.query_params.get('source')
+        if source and source not in rollups.REQUEST_SOURCES:
+            return Response({"result": False, "message": f"source는 {', '.join(rollups.REQUEST_SOURCES)} 중 하나여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = timezone.now() - timedelta(hours=hours)
+        data = rollups.request_counts(since, source=source)
+        return Response({"result": True, "hours": hours, "data": data}, status=status.HTTP_200_OK)
 
 class ReviewView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, hpid):
-        reviews = Review.objects.filter(hospital__hpid=hpid).annotate(comment_count=Count('comments')).order_by('-created_at')
-        return Response(ReviewSerializer(reviews, many=True, context={'request': request}).data, status=status.HTTP_200_OK)
+        # ?cursor=&limit= 로 페이지 단위 조회 (comment_count 는 Review 에 저장된 값)
+        paginator = ReviewCursorPagination()
+        page = paginator.paginate_queryset(Review.objects.filter(hospital_id=hpid), request, view=self)
+        return paginator.get_paginated_response(ReviewSerializer(page, many=True, context={'request': request}).data)
 
     def post(self, request, hpid):
         hospital = get_object_or_404(Hospital, hpid=hpid)
         serializer = ReviewSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(user=request.user, hospital=hospital)
+            with transaction.atomic():
+                review = serializer.save(user=request.user, hospital=hospital)
+                apply_review_change(hospital.hpid, new_rating=review.rating)
+            list_cache.invalidate([hospital.first_address]) # 목록의 평점/리뷰 수 변경
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -545,7 +869,7 @@ class ReviewDetailView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get_object(self, review_id):
-        return get_object_or_404(Review.objects.annotate(comment_count=Count('comments')), id=review_id)
+        return get_object_or_404(Review, id=review_id)
 
     def get(self, request, review_id):
         return Response(ReviewSerializer(self.get_object(review_id), context={'request': request}).data, status=status.HTTP_200_OK)
@@ -554,30 +878,53 @@ class ReviewDetailView(APIView):
         review = self.get_object(review_id)
         if review.user != request.user: return Response({"message": "권한이 없습니다."}, status=status.HTTP_403_FORBIDDEN)
         if timezone.now() - review.created_at > timedelta(days=3): return Response({"message": "작성 후 3일이 지나 수정할 수 없습니다."}, status=status.HTTP_403_FORBIDDEN)
-        serializer = ReviewSerializer(review, data=request.data, partial=True, context={'request': request})
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            # 동시에 수정하면 같은 이전 평점을 두 번 빼지 않도록 행을 잠그고 다시 읽음
+            review = Review.objects.select_for_update().filter(id=review_id).first()
+            if review is None:
+                return Response({"message": "이미 삭제된 리뷰입니다."}, status=status.HTTP_404_NOT_FOUND)
+            serializer = ReviewSerializer(review, data=request.data, partial=True, context={'request': request})
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            old_rating = review.rating
+            review = serializer.save()
+            if review.rating != old_rating:
+                apply_review_change(review.hospital_id, old_rating=old_rating, new_rating=review.rating)
+        list_cache.invalidate([review.hospital.first_address])
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def delete(self, request, review_id):
         review = self.get_object(review_id)
         if review.user != request.user: return Response({"message": "권한이 없습니다."}, status=status.HTTP_403_FORBIDDEN)
-        review.delete()
+        with transaction.atomic():
+            # 수정 중인 평점을 기준으로 빼도록 잠그고 다시 읽음
+            review = Review.objects.select_for_update().filter(id=review_id).first()
+            deleted = 0
+            if review:
+                _, per_model = Review.objects.filter(id=review_id).delete()
+                deleted = per_model.get(Review._meta.label, 0)
+            # 다른 요청이 먼저 지웠으면 집계는 그쪽에서 이미 반영
+            if deleted == 1:
+                apply_review_change(review.hospital_id, old_rating=review.rating)
+        if deleted == 1:
+            list_cache.invalidate([review.hospital.first_address])
         return Response({"message": "삭제되었습니다."}, status=status.HTTP_204_NO_CONTENT)
 
 class CommentView(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, review_id):
-        comments = Comment.objects.filter(review_id=review_id).order_by('created_at')
-        return Response(CommentSerializer(comments, many=True, context={'request': request}).data, status=status.HTTP_200_OK)
+        paginator = CommentCursorPagination()
+        page = paginator.paginate_queryset(Comment.objects.filter(review_id=review_id), request, view=self)
+        return paginator.get_paginated_response(CommentSerializer(page, many=True, context={'request': request}).data)
 
     def post(self, request, review_id):
         review = get_object_or_404(Review, id=review_id)
         serializer = CommentSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save(user=request.user, review=review)
+            with transaction.atomic():
+                serializer.save(user=request.user, review=review)
+                Review.objects.filter(id=review.id).update(comment_count=F('comment_count') + 1)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -600,5 +947,9 @@ class CommentDetailView(APIView):
     def delete(self, request, comment_id):
         comment = self.get_object(comment_id)
         if comment.user != request.user: return Response({"message": "권한이 없습니다."}, status=status.HTTP_403_FORBIDDEN)
-        comment.delete()
+        with transaction.atomic():
+            _, per_model = Comment.objects.filter(id=comment.id).delete()
+            # 다른 요청이 먼저 지웠으면 댓글 수는 그쪽에서 이미 반영
+            if per_model.get(Comment._meta.label, 0) == 1:
+                Review.objects.filter(id=comment.review_id).update(comment_count=F('comment_count') - 1)
         return Response({"message": "삭제되었습니다."}, status=status.HTTP_204_NO_CONTENT)
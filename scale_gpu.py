@@ -163,17 +163,12 @@ def wait_for_ip(instance_id):
     return None
 
 def wait_for_ai_server(ip):
-    url = f"http://{ip}:8080/completion"
-    # AI 서버가 응답할 수 있는 최소한의 페이로드
-    payload = {
-        "prompt": "<|im_start|>user\ntest<|im_end|>\n<|im_start|>assistant\n", 
-        "n_predict": 1, 
-        "temperature": 0.1
-    }
+    # /health 는 모델이 로드되기 전까지 503을 반환
+    url = f"http://{ip}:8080/health"
     print(f"🏥 AI 모델 로딩 대기 중({ip})...", end="")
     for i in range(120): # 최대 10분
         try:
-            response = requests.post(url, json=payload, timeout=2)
+            response = requests.get(url, timeout=2)
             if response.status_code == 200:
                 print("\n✅ AI 서버 준비 완료!")
                 return True